@@ -0,0 +1,65 @@
+import functools
+import threading
+
+import streamlit as st
+import instrumentation
+
+# The compute modules are imported by the functions that use them, so a page only loads what it needs
+# (the Black-Scholes page never imports yfinance or scipy.stats).
+
+# Results are keyed on the inputs, expire after CACHE_TTL seconds and the oldest are evicted past MAX_ENTRIES
+CACHE_TTL = 3600
+MAX_ENTRIES = 256
+MAX_PATH_ENTRIES = 16  # Monte Carlo results hold chart data, keep fewer of them
+
+_miss = threading.local()  # Set by the body of a cached function, which only runs on a cache miss
+
+def _instrumented(cached):
+    "Times a cached function and records its cache hits and misses when instrumentation is enabled"
+    name = f"app_cache.{cached.__name__}"
+
+    @functools.wraps(cached)
+    def wrapper(*args, **kwargs):
+        if not instrumentation.is_enabled():
+            return cached(*args, **kwargs)
+        _miss.flag = False
+        with instrumentation.stage(name):
+            result = cached(*args, **kwargs)
+        instrumentation.cache_event(name, hit=not _miss.flag)
+        return result
+    return wrapper
+
+@_instrumented
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def cached_hist_var(Ticker, Start, End, confidence, returns):
+    from hist_var import HistVar_CVaR
+    _miss.flag = True
+    return HistVar_CVaR(Ticker, Start, End, confidence, returns)
+
+@_instrumented
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def cached_param_var(Ticker, Start, End, confidence, returns):
+    from var_cvar import Param_Var_CVaR
+    _miss.flag = True
+    return Param_Var_CVaR(Ticker, Start, End, confidence, returns)
+
+@_instrumented
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_PATH_ENTRIES, show_spinner="Simulating price paths...")
+def cached_monte_carlo(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations,
+                       max_paths=50, max_points=500, method="lttb"):
+    "Option price with percentile bands and a sample of paths, only the bounded chart data is cached"
+    from monte_carlo_simulation import monte_carlo_option_pricing
+    from path_plotting import fan_chart_data
+    _miss.flag = True
+    option_price, price_paths = monte_carlo_option_pricing(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations)
+    bands, sample = fan_chart_data(price_paths, max_paths=max_paths, max_points=max_points, method=method)
+    return option_price, bands, sample
+
+@_instrumented
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def cached_bs_pricer(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type):
+    "Price, delta, gamma, vega, theta and rho of an option"
+    from bs_pricer import blackScholes, delta_calc, gamma_calc, vega_calc, theta_calc, rho_calc
+    _miss.flag = True
+    args = (risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type)
+    return tuple(float(f(*args)) for f in (blackScholes, delta_calc, gamma_calc, vega_calc, theta_calc, rho_calc))
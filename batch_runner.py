@@ -0,0 +1,256 @@
+import argparse
+import functools
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+# Headless batch runner: streams a CSV/Parquet file of positions or tickers through the pricing and VaR
+# functions chunk by chunk, writes one Parquet part per chunk and records finished chunks in a manifest so an
+# interrupted run resumes where it stopped.
+#
+#   python batch_runner.py bs positions.parquet results/bs --workers 8
+#   python batch_runner.py hist_var tickers.csv results/var --start 2020-01-01 --end 2024-01-01 --confidence 0.99
+
+DEFAULT_CHUNK_SIZE = 10_000  # Input rows per chunk
+MANIFEST = "_manifest.json"  # Files starting with "_" are skipped when the output directory is read as a Parquet dataset
+MARKET_DATA_DIR = "_market_data"  # Price store of runs reading local prices, kept inside the output directory
+
+BS_COLUMNS = ("risk_free_rate", "stock_price", "strike_price", "time_to_maturity", "volatility", "option_type")
+MC_COLUMNS = ("option_type", "stock_price", "strike_price", "volatility", "risk_free_rate", "time_to_maturity", "num_simulations")
+VAR_COLUMNS = ("ticker", "start", "end", "confidence", "returns")
+
+HIST_VAR_OUTPUTS = ("hist_var", "hist_cvar", "volatility_day", "volatility_year")
+PARAM_VAR_OUTPUTS = ("var_norm", "var_t", "cvar_norm", "cvar_t", "volatility_day", "volatility_year", "nu")
+
+def _bs_job(frame, options):
+    from bs_pricer import bs_chain
+    chain = bs_chain(*(frame[column].to_numpy() for column in BS_COLUMNS))
+    chain.index = frame.index
+    return chain
+
+def _rows(frame, columns, function, outputs):
+    """Applies function to every row, a failing row gets NaN results and its error message."""
+    results = np.full((len(frame), len(outputs)), np.nan)
+    errors = [None]*len(frame)
+    for i, row in enumerate(frame[list(columns)].itertuples(index=False)):
+        try:
+            results[i] = function(*row)
+        except Exception as error:
+            errors[i] = f"{type(error).__name__}: {error}"
+    result = pd.DataFrame(results, columns=list(outputs), index=frame.index)
+    result["error"] = pd.Series(errors, index=frame.index, dtype="string")
+    return result
+
+def _mc_job(frame, options):
+    from monte_carlo_simulation import monte_carlo_price
+
+    seeds = frame["seed"] if "seed" in frame else frame.index.to_series() + options.get("seed", 0)
+    def price(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations, seed):
+        result = monte_carlo_price(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity,
+                                   int(num_simulations), seed=int(seed), variance_reduction=options.get("variance_reduction"))
+        return result["price"], result["std_error"]
+    return _rows(frame.assign(seed=seeds.to_numpy()), MC_COLUMNS + ("seed",), price, ("price", "std_error"))
+
+def _price_source(options):
+    """fetcher and cache_dir arguments of the VaR functions, a local price file gets the run's own store."""
+    if options.get("data") is None:
+        return {}
+    from market_data import local_file_fetcher
+    return {"fetcher": local_file_fetcher(options["data"]), "cache_dir": options["market_data_dir"]}
+
+def _hist_var_job(frame, options):
+    from hist_var import HistVar_CVaR
+    return _rows(frame, VAR_COLUMNS, functools.partial(HistVar_CVaR, **_price_source(options)), HIST_VAR_OUTPUTS)
+
+def _param_var_job(frame, options):
+    from var_cvar import Param_Var_CVaR
+    return _rows(frame, VAR_COLUMNS, functools.partial(Param_Var_CVaR, **_price_source(options)), PARAM_VAR_OUTPUTS)
+
+# Job name -> (function, required input columns, columns that can default to a command line option)
+JOBS = {
+    "bs": (_bs_job, BS_COLUMNS, ()),
+    "mc": (_mc_job, MC_COLUMNS, ()),
+    "hist_var": (_hist_var_job, VAR_COLUMNS, ("start", "end", "confidence", "returns")),
+    "param_var": (_param_var_job, VAR_COLUMNS, ("start", "end", "confidence", "returns")),
+}
+
+def read_chunks(input_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields the rows of a CSV or Parquet file as DataFrames of at most chunk_size rows, indexed by row number."""
+    if input_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        batches = (batch.to_pandas() for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size))
+    else:
+        batches = pd.read_csv(input_path, chunksize=chunk_size)
+
+    first_row = 0
+    for frame in batches:
+        frame.index = pd.RangeIndex(first_row, first_row + len(frame), name="row")
+        first_row += len(frame)
+        yield frame
+
+def _prepare(job, frame, options):
+    """Fills the defaultable columns missing from the input with the command line options."""
+    _, required, defaultable = JOBS[job]
+    for column in defaultable:
+        if column not in frame and options.get(column) is not None:
+            frame[column] = options[column]
+    missing = [column for column in required if column not in frame]
+    if missing:
+        raise ValueError(f"Input is missing the columns {missing} needed by the '{job}' job")
+    return frame
+
+def _write_part(output_dir, index, frame):
+    path = os.path.join(output_dir, f"part-{index:06d}.parquet")
+    frame.to_parquet(path + ".tmp", index=True)
+    os.replace(path + ".tmp", path)
+
+def _chunk_task(args):
+    """Runs a job on one chunk and writes its part file, so only the chunk number goes back to the parent."""
+    job, index, frame, options, output_dir = args
+    frame = _prepare(job, frame, options)
+    result = JOBS[job][0](frame, options)
+    _write_part(output_dir, index, frame.join(result, rsuffix="_result"))
+    return index, len(frame)
+
+def _load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST)
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+def run_batch(job, input_path, output_dir, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, resume=True, data=None, **options):
+    """
+    Runs a pricing or VaR job over a large input file, chunk by chunk.
+
+    Parameters
+    ----------
+    job : str
+        "bs" (bs_chain), "mc" (monte_carlo_price), "hist_var" (HistVar_CVaR) or "param_var" (Param_Var_CVaR).
+    input_path : str
+        CSV or Parquet file with one row per position or ticker, see the *_COLUMNS constants. VaR jobs take
+        start, end, confidence and returns from options when the file has no such column.
+    output_dir : str
+        Directory receiving one part-NNNNNN.parquet file per chunk (input columns joined with the results,
+        indexed by input row number) and the _manifest.json checkpoint.
+    chunk_size : int, optional
+        Input rows per chunk, only a few chunks per worker are held in memory at once.
+    workers : int, optional
+        Number of worker processes, -1 for all CPUs, None or 1 to run in this process.
+    resume : bool, optional
+        Skip the chunks already recorded in the manifest of an earlier run with the same job, input, chunk size
+        and options. When False the output directory is started afresh.
+    data : str, optional
+        Local price file or directory used instead of Yahoo Finance by the VaR jobs. Its prices are stored in
+        output_dir/_market_data, never in the shared market data store.
+    **options
+        Job options: seed and variance_reduction for "mc", start, end, confidence and returns for the VaR jobs.
+
+    Returns
+    -------
+    summary : dict
+        Number of chunks and rows processed in this run and number of chunks skipped from the checkpoint.
+
+    Notes
+    -----
+    Rows whose pricing or VaR fails (e.g. an unknown ticker) get NaN results and an "error" message instead of
+    stopping the run. Read the results back with read_results(output_dir).
+    """
+    if job not in JOBS:
+        raise ValueError(f"Unknown job '{job}', expected one of {tuple(JOBS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    if data is not None:
+        options = dict(options, data=os.path.abspath(data), market_data_dir=os.path.abspath(os.path.join(output_dir, MARKET_DATA_DIR)))
+
+    stat = os.stat(input_path)
+    run = {"job": job, "input": os.path.abspath(input_path), "input_size": stat.st_size, "input_mtime": stat.st_mtime,
+           "chunk_size": chunk_size, "options": options}
+    # Compared and stored as it reads back from JSON, e.g. tuples become lists
+    run = json.loads(json.dumps(run))
+    manifest = _load_manifest(output_dir)
+    if resume and manifest is not None:
+        if {key: manifest.get(key) for key in run} != run:
+            raise ValueError(f"{output_dir} holds a run with another job, input or options, pass resume=False (--restart) to overwrite it")
+    else:
+        for name in os.listdir(output_dir):
+            if name.startswith("part-"):
+                os.remove(os.path.join(output_dir, name))
+        manifest = dict(run, completed=[])
+        _save_manifest(output_dir, manifest)
+
+    completed = set(manifest["completed"])
+    tasks = ((job, index, frame, options, output_dir) for index, frame in enumerate(read_chunks(input_path, chunk_size))
+             if index not in completed)
+    summary = {"chunks": 0, "rows": 0, "skipped_chunks": len(completed)}
+
+    def record(index, rows):
+        completed.add(index)
+        manifest["completed"] = sorted(completed)
+        _save_manifest(output_dir, manifest)
+        summary["chunks"] += 1
+        summary["rows"] += rows
+
+    workers = os.cpu_count() if workers == -1 else workers
+    if workers is None or workers <= 1:
+        for task in tasks:
+            record(*_chunk_task(task))
+        return summary
+
+    # Keep at most two chunks per worker in flight so memory stays flat on large inputs
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for task in tasks:
+            pending.add(executor.submit(_chunk_task, task))
+            if len(pending) >= 2*workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(*future.result())
+        for future in wait(pending).done:
+            record(*future.result())
+    return summary
+
+def read_results(output_dir):
+    """Reads every part of a batch run back into one DataFrame ordered by input row."""
+    # Parts are read one by one, CSV chunks may infer different dtypes for the same column
+    parts = sorted(name for name in os.listdir(output_dir) if name.startswith("part-") and name.endswith(".parquet"))
+    return pd.concat([pd.read_parquet(os.path.join(output_dir, name)) for name in parts]).sort_index()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch pricing and VaR over large CSV/Parquet input files.")
+    parser.add_argument("job", choices=list(JOBS))
+    parser.add_argument("input", help="CSV or Parquet input file")
+    parser.add_argument("output", help="output directory for the Parquet parts and the checkpoint manifest")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="input rows per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, -1 for all CPUs")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start the run afresh")
+    parser.add_argument("--data", help="local price file or directory instead of Yahoo Finance")
+    parser.add_argument("--seed", type=int, help="mc: base seed, row n uses seed + n unless the input has a seed column")
+    parser.add_argument("--variance-reduction", nargs="+", help="mc: variance reduction modes")
+    parser.add_argument("--start", help="VaR jobs: start date when the input has no start column")
+    parser.add_argument("--end", help="VaR jobs: end date when the input has no end column")
+    parser.add_argument("--confidence", type=float, help="VaR jobs: confidence when the input has no confidence column "
+                                                         "(decimal for hist_var, percent for param_var)")
+    parser.add_argument("--returns", choices=["simple", "continuously compounded"], help="VaR jobs: return type when the input has no returns column")
+    args = parser.parse_args(argv)
+
+    options = {name: value for name, value in (("seed", args.seed), ("variance_reduction", args.variance_reduction),
+               ("start", args.start), ("end", args.end), ("confidence", args.confidence), ("returns", args.returns))
+               if value is not None}
+    summary = run_batch(args.job, args.input, args.output, chunk_size=args.chunk_size, workers=args.workers,
+                        resume=not args.restart, data=args.data, **options)
+    print(f"{summary['rows']} rows in {summary['chunks']} chunks written to {args.output}"
+          f" ({summary['skipped_chunks']} chunks already done)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
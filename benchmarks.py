@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import market_data
+from bs_pricer import blackScholes, bs_chain, delta_calc, gamma_calc, vega_calc, theta_calc, rho_calc
+from hist_var import HistVar_CVaR
+from monte_carlo_simulation import monte_carlo_option_pricing, monte_carlo_price
+from portfolio_var import Portfolio_VaR_CVaR
+from var_cvar import Param_Var_CVaR
+
+# Offline benchmarks of the pricing and risk functions. Runs are appended to a JSON history and the
+# compare command flags benchmarks that got slower than a threshold between two runs.
+#
+#   python benchmarks.py run [--quick] [--only NAME] [--data PATH]
+#   python benchmarks.py compare [--baseline -2] [--current -1] [--threshold 0.10]
+
+HISTORY_FILE = "benchmark_history.json"
+REGRESSION_THRESHOLD = 0.10  # Relative slowdown flagged by compare
+SYNTHETIC_ORIGIN = "1990-01-01"  # Synthetic prices start here, so every date range sees the same prices
+
+BS_SCALAR_FUNCTIONS = (blackScholes, delta_calc, gamma_calc, vega_calc, theta_calc, rho_calc)
+CHAIN_SIZES = (1_000, 100_000, 1_000_000)
+MC_PATH_COUNTS = (1_000, 10_000, 100_000)
+HISTORY_YEARS = (1, 5, 20)
+TICKER_COUNTS = (1, 10, 50)
+QUICK_SCALE = 0.1  # --quick divides problem sizes by 10
+
+# Cold start of the modules and pages, each measured in a fresh interpreter
+STARTUP_TARGETS = ("bs_pricer", "monte_carlo_simulation", "hist_var", "var_cvar", "app_cache",
+                   "Home_Page.py", "pages/2_Black_Scholes_Pricer_App.py")
+HEAVY_MODULES = ("pandas", "scipy.stats", "yfinance", "plotly", "pyarrow", "py_vollib")
+_STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+target = sys.argv[1]
+if target.endswith(".py"):
+    import runpy
+    runpy.run_path(target, run_name="__main__")
+else:
+    __import__(target)
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules]}))
+"""
+
+def synthetic_fetcher(volatility=0.2, drift=0.05):
+    """
+    Creates a fetcher returning deterministic geometric Brownian motion prices on business days.
+
+    Every ticker gets its own seeded series starting at SYNTHETIC_ORIGIN, so the same ticker and dates
+    always give the same prices and the benchmarks never touch the network.
+    """
+    def fetch(tickers, start, end):
+        dates = pd.bdate_range(SYNTHETIC_ORIGIN, end, inclusive="left", name="Date")
+        dt = 1 / 252
+        columns = {}
+        for ticker in tickers:
+            rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+            steps = (drift - volatility**2/2)*dt + volatility*np.sqrt(dt)*rng.standard_normal(len(dates))
+            columns[ticker] = 100*np.exp(np.cumsum(steps))
+        frame = pd.DataFrame(columns, index=dates)
+        return frame[frame.index >= start]
+
+    fetch.source_id = f"synthetic_{volatility:g}_{drift:g}"
+    return fetch
+
+@contextmanager
+def _offline_market_data(fetcher):
+    """Routes market_data to the given fetcher and a throwaway Parquet store."""
+    previous_fetcher, previous_dir = market_data._default_fetcher, market_data.CACHE_DIR
+    with tempfile.TemporaryDirectory() as cache_dir:
+        market_data.set_default_fetcher(fetcher)
+        market_data.CACHE_DIR = cache_dir
+        try:
+            yield
+        finally:
+            market_data.set_default_fetcher(previous_fetcher)
+            market_data.CACHE_DIR = previous_dir
+
+def _time(function, repeat=5, number=1):
+    """Median and best seconds per call over repeat rounds of number calls, after one warm-up call."""
+    function()
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        rounds.append((time.perf_counter() - start)/number)
+    return float(np.median(rounds)), float(np.min(rounds))
+
+def _result(seconds, best, work=None, unit=None, **params):
+    result = {"seconds": seconds, "best_seconds": best, "params": params}
+    if work is not None:
+        result["throughput"] = work/seconds
+        result["unit"] = unit
+    return result
+
+def bench_bs_latency(scale=1.0):
+    """Per-option latency of each scalar BS function."""
+    number = max(int(2000*scale), 100)
+    results = {}
+    for function in BS_SCALAR_FUNCTIONS:
+        for option_type in ("Call", "Put"):
+            args = (0.03, 100.0, 105.0, 0.5, 0.2, option_type)
+            seconds, best = _time(lambda: function(*args), number=number)
+            results[f"bs_latency.{function.__name__}.{option_type}"] = _result(seconds, best, 1, "calls/s")
+    return results
+
+def bench_bs_chain(scale=1.0):
+    """Options priced per second by bs_chain against the chain size."""
+    rng = np.random.default_rng(0)
+    results = {}
+    for size in CHAIN_SIZES:
+        size = max(int(size*scale), 10)
+        strikes = rng.uniform(50, 150, size)
+        is_call = rng.random(size) < 0.5
+        seconds, best = _time(lambda: bs_chain(0.03, 100.0, strikes, 0.5, 0.2, is_call))
+        results[f"bs_chain.{size}"] = _result(seconds, best, size, "options/s", size=size)
+    return results
+
+def bench_monte_carlo(scale=1.0):
+    """Simulated paths per second against the number of paths, with and without storing the paths."""
+    results = {}
+    for paths in MC_PATH_COUNTS:
+        paths = max(int(paths*scale), 100)
+        seconds, best = _time(lambda: monte_carlo_option_pricing("Call", 100, 105, 0.2, 0.03, 1.0, paths, seed=0), repeat=3)
+        results[f"mc_paths.{paths}"] = _result(seconds, best, paths, "paths/s", num_simulations=paths)
+        seconds, best = _time(lambda: monte_carlo_price("Call", 100, 105, 0.2, 0.03, 1.0, paths*10, seed=0), repeat=3)
+        results[f"mc_terminal.{paths*10}"] = _result(seconds, best, paths*10, "paths/s", num_simulations=paths*10)
+    return results
+
+def bench_var(scale=1.0):
+    """Historical and parametric VaR runtime against the history length, portfolio VaR against the ticker count."""
+    results = {}
+    end = pd.Timestamp("2024-01-01")
+    repeat = 5 if scale >= 1 else 3
+    for years in HISTORY_YEARS:
+        start = end - pd.DateOffset(years=years)
+        seconds, best = _time(lambda: HistVar_CVaR("SYN0", start, end, 0.95, "simple"), repeat=repeat)
+        results[f"hist_var.{years}y"] = _result(seconds, best, years=years)
+        seconds, best = _time(lambda: Param_Var_CVaR("SYN0", start, end, 95, "simple"), repeat=repeat)
+        results[f"param_var.{years}y"] = _result(seconds, best, years=years)
+
+    start = end - pd.DateOffset(years=5)
+    for count in TICKER_COUNTS:
+        tickers = [f"SYN{i}" for i in range(count)]
+        weights = np.full(count, 1/count)
+        seconds, best = _time(lambda: Portfolio_VaR_CVaR(tickers, weights, start, end, 0.95, "simple"), repeat=repeat)
+        results[f"portfolio_var.{count}_tickers"] = _result(seconds, best, tickers=count, years=5)
+    return results
+
+def measure_startup(target, heavy_modules=HEAVY_MODULES):
+    """
+    Measures the cold start of a module or page in a fresh interpreter.
+
+    Parameters
+    ----------
+    target : str
+        Module name (e.g. "bs_pricer") or path of a script relative to the repository (e.g. "Home_Page.py"),
+        scripts are run as Streamlit runs them, pages render in bare mode.
+    heavy_modules : tuple of str, optional
+        Modules reported when the target loaded them.
+
+    Returns
+    -------
+    startup : dict
+        "seconds" spent importing (or running) the target and the heavy modules it "loaded".
+    """
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", _STARTUP_SCRIPT, target, json.dumps(list(heavy_modules))],
+                            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def bench_startup(scale=1.0):
+    """Cold start time of the compute modules and app pages, and which heavy dependencies they load."""
+    repeat = 5 if scale >= 1 else 3
+    results = {}
+    for target in STARTUP_TARGETS:
+        runs = [measure_startup(target) for _ in range(repeat)]
+        seconds = [run["seconds"] for run in runs]
+        name = os.path.splitext(os.path.basename(target))[0]
+        results[f"startup.{name}"] = _result(float(np.median(seconds)), float(np.min(seconds)), loaded=runs[-1]["loaded"])
+    return results
+
+BENCHMARKS = {"bs_latency": bench_bs_latency, "bs_chain": bench_bs_chain, "monte_carlo": bench_monte_carlo, "var": bench_var, "startup": bench_startup}
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(only=None, quick=False, data=None):
+    """
+    Runs the benchmarks offline.
+
+    Parameters
+    ----------
+    only : list of str, optional
+        Names from BENCHMARKS to run, all by default.
+    quick : bool, optional
+        Run on problem sizes divided by 10.
+    data : str, optional
+        Local price file or directory (see market_data.local_file_fetcher) with tickers SYN0, SYN1, ...
+        Synthetic prices are used by default.
+
+    Returns
+    -------
+    run : dict
+        Timestamp, git commit, environment and one result per benchmark with its median seconds per call.
+    """
+    fetcher = synthetic_fetcher() if data is None else market_data.local_file_fetcher(data)
+    scale = QUICK_SCALE if quick else 1.0
+    results = {}
+    with _offline_market_data(fetcher):
+        for name in only or BENCHMARKS:
+            results.update(BENCHMARKS[name](scale))
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "quick": quick,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "results": results,
+    }
+
+def load_history(path=HISTORY_FILE):
+    """Returns the list of recorded runs, oldest first."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return json.load(file)
+
+def append_history(run, path=HISTORY_FILE):
+    history = load_history(path)
+    history.append(run)
+    with open(path, "w") as file:
+        json.dump(history, file, indent=2)
+
+def compare_runs(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Compares the median timings of two runs.
+
+    Returns
+    -------
+    comparison : pandas.DataFrame
+        One row per benchmark found in both runs with both timings, the relative change
+        (positive is slower) and whether it is a regression beyond threshold.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        if name in baseline["results"]:
+            before, after = baseline["results"][name]["seconds"], result["seconds"]
+            rows.append({"Benchmark": name, "Baseline (s)": before, "Current (s)": after, "Change": after/before - 1})
+    comparison = pd.DataFrame(rows, columns=["Benchmark", "Baseline (s)", "Current (s)", "Change"]).set_index("Benchmark")
+    comparison["Regression"] = comparison["Change"] > threshold
+    return comparison
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the pricing and risk functions.")
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON file holding the recorded runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and append the results to the history")
+    run.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run")
+    run.add_argument("--quick", action="store_true", help="problem sizes divided by 10")
+    run.add_argument("--data", help="local price file or directory instead of synthetic prices")
+
+    compare = commands.add_parser("compare", help="compare two recorded runs, exit status 1 on regressions")
+    compare.add_argument("--baseline", type=int, default=-2, help="index of the baseline run in the history")
+    compare.add_argument("--current", type=int, default=-1, help="index of the compared run in the history")
+    compare.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="relative slowdown flagged as a regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        result = run_benchmarks(args.only, args.quick, args.data)
+        append_history(result, args.history)
+        for name, value in result["results"].items():
+            throughput = f"  {value['throughput']:,.0f} {value['unit']}" if "throughput" in value else ""
+            print(f"{name:<40} {value['seconds']*1e3:>12.4f} ms{throughput}")
+        return 0
+
+    history = load_history(args.history)
+    if len(history) < 2:
+        print(f"Need at least two runs in {args.history} to compare", file=sys.stderr)
+        return 2
+    comparison = compare_runs(history[args.baseline], history[args.current], args.threshold)
+    print(comparison.to_string(formatters={"Change": "{:+.1%}".format}))
+    regressions = comparison.index[comparison["Regression"]]
+    if len(regressions):
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,5 @@
 import numpy as np
-from scipy.stats import norm
-from py_vollib.black_scholes import black_scholes as bs
-from py_vollib.black_scholes.greeks.analytical import delta, gamma, vega, theta, rho
+from scipy.special import ndtr
 
 # Function to calculate the option payoff based on option type
 def calculate_option_payoff(option_type, stock_price, strike_price):
@@ -10,6 +8,187 @@ def calculate_option_payoff(option_type, stock_price, strike_price):
     elif option_type == "Put":
         return max(strike_price - stock_price, 0)
 
+GREEKS = ("price", "delta", "gamma", "vega", "theta", "rho")
+
+# Function to calculate the standard normal density
+def _norm_pdf(x):
+    return np.exp(-x**2/2)/np.sqrt(2*np.pi)
+
+# Function to turn an option type (or array of them) into a boolean call flag
+def _call_flag(option_type):
+    option_type = np.asarray(option_type)
+    if option_type.dtype == bool:
+        return option_type
+    return np.char.lower(option_type.astype(str)).astype("U1") == "c"
+
+# Function to calculate BS price and greeks on broadcast arrays
+def _bs_core(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, is_call):
+    "Calculate BS price and greeks, computing d1/d2 once for every option"
+    sqrt_t = np.sqrt(time_to_maturity)
+    vol_sqrt_t = volatility*sqrt_t
+    d1 = (np.log(stock_price/strike_price) + (risk_free_rate + volatility**2/2)*time_to_maturity)/vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+
+    sign = np.where(is_call, 1.0, -1.0)
+    discounted_strike = strike_price*np.exp(-risk_free_rate*time_to_maturity)
+    pdf_d1 = _norm_pdf(d1)
+    cdf_d1 = ndtr(sign*d1)
+    cdf_d2 = ndtr(sign*d2)
+
+    return {
+        "price": sign*(stock_price*cdf_d1 - discounted_strike*cdf_d2),
+        "delta": sign*cdf_d1,
+        "gamma": pdf_d1/(stock_price*vol_sqrt_t),
+        "vega": stock_price*pdf_d1*sqrt_t*0.01,
+        "theta": (-stock_price*pdf_d1*volatility/(2*sqrt_t) - sign*risk_free_rate*discounted_strike*cdf_d2)/365,
+        "rho": sign*discounted_strike*time_to_maturity*cdf_d2*0.01,
+    }
+
+# Function to calculate BS price and greeks keeping the broadcast shape of the inputs
+def bs_values(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type):
+    """
+    Calculates the Black-Scholes price and greeks on broadcast arrays without flattening them.
+
+    Parameters
+    ----------
+    risk_free_rate, stock_price, strike_price, time_to_maturity, volatility : float or array_like
+        Option inputs, broadcast against each other (annualised rate and volatility, maturity in years).
+    option_type : str, bool or array_like
+        "Call"/"Put" (or "c"/"p") per option, or a boolean array that is True for calls.
+
+    Returns
+    -------
+    values : dict
+        Arrays of the broadcast shape for price, delta, gamma, vega, theta and rho, in the units of bs_chain.
+    """
+    return _bs_core(*(np.asarray(x, dtype=float) for x in (risk_free_rate, stock_price, strike_price, time_to_maturity, volatility)),
+                    _call_flag(option_type))
+
+# Function to price a whole option chain with BS in one call
+def bs_chain(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type, as_frame=True):
+    """
+    Calculates the Black-Scholes price and greeks of many options at once.
+
+    Parameters
+    ----------
+    risk_free_rate, stock_price, strike_price, time_to_maturity, volatility : float or array_like
+        Option inputs, broadcast against each other (annualised rate and volatility, maturity in years).
+    option_type : str, bool or array_like
+        "Call"/"Put" (or "c"/"p") per option, or a boolean array that is True for calls.
+    as_frame : bool, optional
+        Return a pandas DataFrame (default) instead of a numpy structured array.
+
+    Returns
+    -------
+    chain : pandas.DataFrame or numpy structured array
+        One row per option with columns price, delta, gamma, vega, theta and rho.
+
+    Notes
+    -----
+    Greeks follow the scalar functions of this module: vega and rho per 1% move, theta per calendar day.
+    d1 and d2 are computed once per option and all inputs are flattened after broadcasting.
+    """
+    inputs = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (risk_free_rate, stock_price, strike_price, time_to_maturity, volatility)),
+                                 _call_flag(option_type))
+    results = _bs_core(*(x.ravel() for x in inputs))
+
+    if as_frame:
+        import pandas as pd
+        return pd.DataFrame(results)
+    chain = np.empty(len(results["price"]), dtype=[(name, float) for name in GREEKS])
+    for name in GREEKS:
+        chain[name] = results[name]
+    return chain
+
+# Function to calculate BS call price, vega and vomma (per unit of volatility) for the implied volatility solver
+def _call_price_vega_vomma(risk_free_rate, stock_price, discounted_strike, time_to_maturity, volatility):
+    sqrt_t = np.sqrt(time_to_maturity)
+    vol_sqrt_t = volatility*sqrt_t
+    d1 = (np.log(stock_price/discounted_strike) + volatility**2/2*time_to_maturity)/vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+    price = stock_price*ndtr(d1) - discounted_strike*ndtr(d2)
+    vega = stock_price*_norm_pdf(d1)*sqrt_t
+    return price, vega, vega*d1*d2/volatility
+
+# Function to calculate implied volatilities for a whole option chain
+def implied_volatility(option_price, risk_free_rate, stock_price, strike_price, time_to_maturity, option_type,
+                       tol=1e-10, max_iter=50, max_vol=10.0):
+    """
+    Calculates Black-Scholes implied volatilities from market prices, vectorised over a whole chain.
+
+    Parameters
+    ----------
+    option_price : float or array_like
+        Observed option prices.
+    risk_free_rate, stock_price, strike_price, time_to_maturity : float or array_like
+        Option inputs, broadcast against option_price.
+    option_type : str, bool or array_like
+        "Call"/"Put" (or "c"/"p") per option, or a boolean array that is True for calls.
+    tol : float, optional
+        Absolute price tolerance for convergence.
+    max_iter : int, optional
+        Maximum number of Halley/bisection iterations.
+    max_vol : float, optional
+        Upper end of the volatility search bracket.
+
+    Returns
+    -------
+    implied_vol : numpy.ndarray
+        Implied volatilities with the broadcast shape of the inputs. Quotes outside the no-arbitrage
+        bounds, or that did not converge, are NaN.
+
+    Notes
+    -----
+    Puts are converted to calls through put-call parity. The starting point is the Corrado-Miller
+    approximation, refined by Halley steps on the BS vega (the same vega as vega_calc, per unit of
+    volatility). Each option keeps a bracket around the root and falls back to bisection whenever a
+    step leaves it, so every quote converges or is flagged.
+    """
+    inputs = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (option_price, risk_free_rate, stock_price, strike_price, time_to_maturity)),
+                                 _call_flag(option_type))
+    price, rate, spot, strike, ttm, is_call = (x.ravel() for x in inputs)
+    discounted_strike = strike*np.exp(-rate*ttm)
+
+    # Put-call parity, then keep only quotes strictly inside the call no-arbitrage bounds
+    call_price = np.where(is_call, price, price + spot - discounted_strike)
+    valid = (call_price > np.maximum(spot - discounted_strike, 0)) & (call_price < spot) & (ttm > 0) & (spot > 0) & (strike > 0)
+
+    vol = np.full(price.shape, np.nan)
+    idx = np.flatnonzero(valid)
+    target, spot, discounted_strike, ttm, rate = call_price[idx], spot[idx], discounted_strike[idx], ttm[idx], rate[idx]
+
+    # Corrado-Miller initial guess
+    forward_gap = spot - discounted_strike
+    centre = target - forward_gap/2
+    guess = np.sqrt(2*np.pi)/(spot + discounted_strike)*(centre + np.sqrt(np.maximum(centre**2 - forward_gap**2/np.pi, 0)))/np.sqrt(ttm)
+    sigma = np.clip(np.nan_to_num(guess, nan=0.2), 1e-4, max_vol/2)
+    lower, upper = np.zeros_like(sigma), np.full_like(sigma, max_vol)
+
+    active = np.arange(len(idx))
+    for _ in range(max_iter):
+        s = sigma[active]
+        model, vega, vomma = _call_price_vega_vomma(rate[active], spot[active], discounted_strike[active], ttm[active], s)
+        diff = model - target[active]
+        converged = np.abs(diff) < tol
+        lower[active] = np.where(diff < 0, s, lower[active])
+        upper[active] = np.where(diff > 0, s, upper[active])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = diff/vega
+            step = newton/(1 - newton*vomma/(2*vega))
+        proposal = s - step
+        lo, hi = lower[active], upper[active]
+        outside = ~np.isfinite(proposal) | (proposal <= lo) | (proposal >= hi)
+        sigma[active] = np.where(converged, s, np.where(outside, (lo + hi)/2, proposal))
+
+        active = active[~converged]
+        if len(active) == 0:
+            break
+
+    sigma[active] = np.nan
+    vol[idx] = sigma
+    return vol.reshape(inputs[0].shape)
+
 # Function to calculate option price with BS
 def blackScholes(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type):
     "Calculate BS price of call/put"
@@ -17,13 +196,11 @@ def blackScholes(risk_free_rate, stock_price, strike_price, time_to_maturity, vo
     d2 = d1 - volatility*np.sqrt(time_to_maturity)
     
     if option_type == "Call":
-        price = stock_price*norm.cdf(d1, 0, 1) - strike_price*np.exp(-risk_free_rate*time_to_maturity)*norm.cdf(d2, 0, 1)
+        price = stock_price*ndtr(d1) - strike_price*np.exp(-risk_free_rate*time_to_maturity)*ndtr(d2)
     elif option_type == "Put":
-        price = strike_price*np.exp(-risk_free_rate*time_to_maturity)*norm.cdf(-d2, 0, 1) - stock_price*norm.cdf(-d1, 0, 1)
-
-    type = option_type[0].lower()
+        price = strike_price*np.exp(-risk_free_rate*time_to_maturity)*ndtr(-d2) - stock_price*ndtr(-d1)
 
-    return (price + bs(type, stock_price, strike_price, time_to_maturity, risk_free_rate, volatility))/2
+    return price
 
 # Function to calculate option delta with BS
 def delta_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type):
@@ -31,13 +208,11 @@ def delta_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, vola
     d1 = (np.log(stock_price/strike_price) + (risk_free_rate + volatility**2/2)*time_to_maturity)/(volatility*np.sqrt(time_to_maturity))
     
     if option_type == "Call":
-        delta_calc = norm.cdf(d1, 0, 1)
+        delta_calc = ndtr(d1)
     elif option_type == "Put":
-        delta_calc = -norm.cdf(-d1, 0, 1)
-    
-    type = option_type[0].lower()
-    
-    return (delta_calc + delta(type, stock_price, strike_price, time_to_maturity, risk_free_rate, volatility))/2
+        delta_calc = -ndtr(-d1)
+
+    return delta_calc
 
 
 # Function to calculate option gamma with BS
@@ -45,21 +220,17 @@ def gamma_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, vola
     "Calculate gamma of a option"
     d1 = (np.log(stock_price/strike_price) + (risk_free_rate + volatility**2/2)*time_to_maturity)/(volatility*np.sqrt(time_to_maturity))
 
-    gamma_calc = norm.pdf(d1, 0, 1)/(stock_price*volatility*np.sqrt(time_to_maturity))
-    
-    type = option_type[0].lower()
-    
-    return (gamma_calc + gamma(type, stock_price, strike_price, time_to_maturity, risk_free_rate, volatility))/2
+    gamma_calc = _norm_pdf(d1)/(stock_price*volatility*np.sqrt(time_to_maturity))
+
+    return gamma_calc
 
 def vega_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type):
     "Calculate BS price of call/put"
     d1 = (np.log(stock_price/strike_price) + (risk_free_rate + volatility**2/2)*time_to_maturity)/(volatility*np.sqrt(time_to_maturity))
     
-    vega_calc = stock_price*norm.pdf(d1, 0, 1)*np.sqrt(time_to_maturity)
-    
-    type = option_type[0].lower()
-    
-    return (vega_calc*0.01 + vega(type, stock_price, strike_price, time_to_maturity, risk_free_rate, volatility))/2
+    vega_calc = stock_price*_norm_pdf(d1)*np.sqrt(time_to_maturity)
+
+    return vega_calc*0.01
 
 def theta_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type):
     "Calculate BS price of call/put"
@@ -67,13 +238,11 @@ def theta_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, vola
     d2 = d1 - volatility*np.sqrt(time_to_maturity)
     
     if option_type == "Call":
-        theta_calc = -stock_price*norm.pdf(d1, 0, 1)*volatility/(2*np.sqrt(time_to_maturity)) - risk_free_rate*strike_price*np.exp(-risk_free_rate*time_to_maturity)*norm.cdf(d2, 0, 1)
+        theta_calc = -stock_price*_norm_pdf(d1)*volatility/(2*np.sqrt(time_to_maturity)) - risk_free_rate*strike_price*np.exp(-risk_free_rate*time_to_maturity)*ndtr(d2)
     elif option_type == "Put":
-        theta_calc = -stock_price*norm.pdf(d1, 0, 1)*volatility/(2*np.sqrt(time_to_maturity)) + risk_free_rate*strike_price*np.exp(-risk_free_rate*time_to_maturity)*norm.cdf(-d2, 0, 1)
-    
-    type = option_type[0].lower()
+        theta_calc = -stock_price*_norm_pdf(d1)*volatility/(2*np.sqrt(time_to_maturity)) + risk_free_rate*strike_price*np.exp(-risk_free_rate*time_to_maturity)*ndtr(-d2)
 
-    return (theta_calc/365 + theta(type, stock_price, strike_price, time_to_maturity, risk_free_rate, volatility))/2
+    return theta_calc/365
 
 def rho_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type):
     "Calculate BS price of call/put"
@@ -81,10 +250,8 @@ def rho_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volati
     d2 = d1 - volatility*np.sqrt(time_to_maturity)
 
     if option_type == "Call":
-        rho_calc = strike_price*time_to_maturity*np.exp(-risk_free_rate*time_to_maturity)*norm.cdf(d2, 0, 1)
+        rho_calc = strike_price*time_to_maturity*np.exp(-risk_free_rate*time_to_maturity)*ndtr(d2)
     elif option_type == "Put":
-        rho_calc = -strike_price*time_to_maturity*np.exp(-risk_free_rate*time_to_maturity)*norm.cdf(-d2, 0, 1)
-    
-    type = option_type[0].lower()
-    
-    return (rho_calc*0.01 + rho(type, stock_price, strike_price, time_to_maturity, risk_free_rate, volatility))/2
+        rho_calc = -strike_price*time_to_maturity*np.exp(-risk_free_rate*time_to_maturity)*ndtr(-d2)
+
+    return rho_calc*0.01
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+from bs_pricer import GREEKS, bs_chain, blackScholes, delta_calc, gamma_calc, vega_calc, theta_calc, rho_calc
+from monte_carlo_simulation import VARIANCE_REDUCTION_MODES, monte_carlo_price
+
+# Cross-validation of the NumPy/SciPy pricing core against py_vollib, and a bias check of the Monte Carlo pricer
+# against Black-Scholes. py_vollib is only imported here, so it is an optional dependency of the verification
+# harness and not of the app.
+
+SCALAR_FUNCTIONS = dict(zip(GREEKS, (blackScholes, delta_calc, gamma_calc, vega_calc, theta_calc, rho_calc)))
+PARAMETER_RANGES = {
+    "risk_free_rate": (0.0, 0.10),
+    "stock_price": (10.0, 500.0),
+    "moneyness": (0.5, 1.5),  # strike / spot
+    "time_to_maturity": (0.02, 3.0),
+    "volatility": (0.05, 1.0),
+}
+
+def random_parameter_grid(num_samples, seed=0):
+    """ Random option inputs drawn uniformly over PARAMETER_RANGES, half calls and half puts """
+    rng = np.random.default_rng(seed)
+    draw = {name: rng.uniform(low, high, num_samples) for name, (low, high) in PARAMETER_RANGES.items()}
+    return pd.DataFrame({
+        "risk_free_rate": draw["risk_free_rate"],
+        "stock_price": draw["stock_price"],
+        "strike_price": draw["stock_price"]*draw["moneyness"],
+        "time_to_maturity": draw["time_to_maturity"],
+        "volatility": draw["volatility"],
+        "option_type": np.where(rng.random(num_samples) < 0.5, "Call", "Put"),
+    })
+
+def _vollib_values(grid):
+    from py_vollib.black_scholes import black_scholes
+    from py_vollib.black_scholes.greeks.analytical import delta, gamma, vega, theta, rho
+
+    functions = dict(zip(GREEKS, (black_scholes, delta, gamma, vega, theta, rho)))
+    values = {name: np.empty(len(grid)) for name in GREEKS}
+    for i, row in enumerate(grid.itertuples(index=False)):
+        args = (row.option_type[0].lower(), row.stock_price, row.strike_price, row.time_to_maturity, row.risk_free_rate, row.volatility)
+        for name, function in functions.items():
+            values[name][i] = function(*args)
+    return pd.DataFrame(values)
+
+def cross_validate(num_samples=10_000, seed=0, tol=1e-8):
+    """
+    Checks bs_pricer against py_vollib on a randomized parameter grid.
+
+    Parameters
+    ----------
+    num_samples : int, optional
+        Number of random options.
+    seed : int, optional
+        Seed of the parameter grid.
+    tol : float, optional
+        Largest accepted error, relative to max(1, |py_vollib value|).
+
+    Returns
+    -------
+    report : pandas.DataFrame
+        One row per quantity (price and greeks) with the largest absolute and relative error of bs_chain and
+        of the scalar functions against py_vollib, and whether both are within tol.
+
+    Notes
+    -----
+    py_vollib prices one option per call, so the grid is looped over in Python and larger grids take a while.
+    Greeks are compared in bs_pricer units, which match py_vollib's (vega and rho per 1%, theta per day).
+    """
+    grid = random_parameter_grid(num_samples, seed)
+    reference = _vollib_values(grid)
+    inputs = [grid[name].to_numpy() for name in ("risk_free_rate", "stock_price", "strike_price", "time_to_maturity", "volatility", "option_type")]
+    chain = bs_chain(*inputs)
+
+    rows = []
+    for name in GREEKS:
+        scalar = np.array([SCALAR_FUNCTIONS[name](*args) for args in zip(*inputs)], dtype=float)
+        scale = np.maximum(np.abs(reference[name].to_numpy()), 1)
+        chain_error = np.abs(chain[name].to_numpy() - reference[name].to_numpy())
+        scalar_error = np.abs(scalar - reference[name].to_numpy())
+        rows.append({"Quantity": name, "Chain Max Abs Error": chain_error.max(), "Chain Max Rel Error": (chain_error/scale).max(),
+                     "Scalar Max Abs Error": scalar_error.max(), "Scalar Max Rel Error": (scalar_error/scale).max()})
+
+    report = pd.DataFrame(rows).set_index("Quantity")
+    report["Passed"] = (report["Chain Max Rel Error"] <= tol) & (report["Scalar Max Rel Error"] <= tol)
+    return report
+
+def check_monte_carlo(num_simulations=1_000_000, seeds=range(20), max_z=3.0, option_type="Call", stock_price=100.0,
+                      strike_price=100.0, volatility=0.2, risk_free_rate=0.05, time_to_maturity=1.0):
+    """
+    Checks that the Monte Carlo price is unbiased under every variance reduction mode.
+
+    Parameters
+    ----------
+    num_simulations : int, optional
+        Paths per price, large enough for a bias to stand out of the noise.
+    seeds : iterable of int, optional
+        Seeds of the independent prices.
+    max_z : float, optional
+        Largest accepted distance between the mean price and Black-Scholes, in standard errors of the mean.
+    option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity
+        European option priced by both methods.
+
+    Returns
+    -------
+    report : pandas.DataFrame
+        One row per variance reduction mode with the bias of the mean price, its z-score against the spread of
+        the prices across seeds, the mean reported standard error, the share of seeds further than two reported
+        standard errors from Black-Scholes, and whether the z-score is within max_z.
+    """
+    reference = blackScholes(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type)
+    rows = []
+    for mode in (None,) + VARIANCE_REDUCTION_MODES:
+        results = [monte_carlo_price(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity,
+                                     num_simulations, seed=seed, variance_reduction=mode) for seed in seeds]
+        prices = np.array([result["price"] for result in results])
+        std_errors = np.array([result["std_error"] for result in results])
+        bias = prices.mean() - reference
+        rows.append({"Mode": mode or "none", "Bias": bias, "Z": bias/(prices.std(ddof=1)/np.sqrt(len(prices))),
+                     "Mean Std Error": std_errors.mean(), "Outside 2 SE": np.mean(np.abs(prices - reference) > 2*std_errors)})
+
+    report = pd.DataFrame(rows).set_index("Mode")
+    report["Passed"] = report["Z"].abs() <= max_z
+    return report
+
+if __name__ == "__main__":
+    report = cross_validate()
+    print(report.to_string())
+    monte_carlo_report = check_monte_carlo()
+    print(monte_carlo_report.to_string())
+    raise SystemExit(0 if report["Passed"].all() and monte_carlo_report["Passed"].all() else 1)
@@ -1,8 +1,9 @@
 import numpy as np
 import pandas as pd
-import yfinance as yf
+from instrumentation import stage
+from market_data import get_close_prices
 
-def HistVar_CVaR(Ticker, Start, End, confidence, returns):
+def HistVar_CVaR(Ticker, Start, End, confidence, returns, fetcher=None, cache_dir=None):
     """
     Gets stock price data from Yahoo Finance and calculates the historical Value at Risk (VaR) and Conditional Value at Risk (CVaR).
 
@@ -18,6 +19,10 @@ def HistVar_CVaR(Ticker, Start, End, confidence, returns):
         The confidence level for VaR and CVaR calculation, expressed as a decimal (e.g., 0.95 for 95% confidence).
     returns : str, optional
         The type of returns to calculate. Can be "simple" for simple returns or "continuously compounded" for log returns. Default is "simple".
+    fetcher : callable, optional
+        Price source passed to market_data.get_close_prices, defaults to Yahoo Finance.
+    cache_dir : str, optional
+        Price store passed to market_data.get_close_prices, defaults to market_data.CACHE_DIR.
 
     Returns
     -------
@@ -48,14 +53,16 @@ def HistVar_CVaR(Ticker, Start, End, confidence, returns):
         Start = pd.to_datetime(Start) - pd.Timedelta(days=1)
         End = pd.to_datetime(End)
 
-    # Fetch data from Yahoo Finance using yfinance
-    Data = yf.download(Ticker, start=Start, end=End, auto_adjust=True)['Close']
+    # Fetch data from the local price cache, only missing dates are downloaded from Yahoo Finance
+    with stage("hist_var.prices"):
+        Data = get_close_prices(Ticker, Start, End, fetcher=fetcher, cache_dir=cache_dir)
 
     # Calculate daily returns
-    if returns == "simple":
-        StockReturns = Data.pct_change().dropna()
-    elif returns == "continuously compounded":
-        StockReturns = np.log(Data / Data.shift(1)).dropna()
+    with stage("hist_var.returns"):
+        if returns == "simple":
+            StockReturns = Data.pct_change().dropna()
+        elif returns == "continuously compounded":
+            StockReturns = np.log(Data / Data.shift(1)).dropna()
 
     # Historical VaR calculation
     histVar = np.percentile(StockReturns, (1 - confidence) * 100)
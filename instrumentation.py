@@ -0,0 +1,216 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+# Lightweight, process-wide instrumentation: stage timers, counters, cache hit/miss statistics and memory
+# high-water marks. Everything is a no-op until enabled with enable() or the QF_INSTRUMENTATION environment
+# variable; QF_INSTRUMENTATION_MEMORY additionally turns on tracemalloc, which slows allocations down.
+
+logger = logging.getLogger(__name__)
+
+_TRUE = ("1", "true", "yes", "on")
+_enabled = os.environ.get("QF_INSTRUMENTATION", "").lower() in _TRUE
+_track_memory = os.environ.get("QF_INSTRUMENTATION_MEMORY", "").lower() in _TRUE
+
+_lock = threading.Lock()
+_stages = {}  # name -> [calls, total seconds, max seconds, peak memory bytes]
+_counters = {}
+_local = threading.local()  # Per-thread stack of the peaks of the open stages
+_NULL_STAGE = nullcontext()
+
+
+def enable(track_memory=None):
+    """Turns instrumentation on, track_memory also records memory high-water marks with tracemalloc."""
+    global _enabled, _track_memory
+    _enabled = True
+    if track_memory is not None:
+        _track_memory = track_memory
+
+
+def disable():
+    """Turns instrumentation off, recorded statistics are kept until reset()."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Clears every recorded statistic."""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def count(name, n=1):
+    """Adds n to a counter."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def cache_event(cache, hit):
+    """Records a hit or a miss of a cache, reported by cache_stats()."""
+    count(f"{cache}.hit" if hit else f"{cache}.miss")
+
+
+def _memory_enter():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    stack = getattr(_local, "peaks", None)
+    if stack is None:
+        stack = _local.peaks = []
+    # The peak reached so far belongs to the enclosing stage before it is reset for this one
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1] = max(stack[-1], peak)
+    tracemalloc.reset_peak()
+    stack.append(current)
+    return current
+
+
+def _memory_exit(start):
+    stack = _local.peaks
+    peak = max(stack.pop(), tracemalloc.get_traced_memory()[1])
+    if stack:
+        stack[-1] = max(stack[-1], peak)
+    return peak - start
+
+
+@contextmanager
+def _timed_stage(name):
+    memory_start = _memory_enter() if _track_memory else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        memory = _memory_exit(memory_start) if memory_start is not None else None
+        with _lock:
+            stats = _stages.setdefault(name, [0, 0.0, 0.0, None])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            if memory is not None:
+                stats[3] = memory if stats[3] is None else max(stats[3], memory)
+
+
+def stage(name):
+    """
+    Context manager timing a stage of a computation.
+
+    Examples
+    --------
+    >>> with stage("hist_var.returns"):
+    ...     StockReturns = Data.pct_change().dropna()
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _timed_stage(name)
+
+
+def timed(name=None):
+    """Decorator timing every call of a function as a stage, named after the function by default."""
+    def decorator(function):
+        stage_name = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _timed_stage(stage_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Hits, misses and hit rate of every cache reported through cache_event()."""
+    with _lock:
+        counters = dict(_counters)
+    caches = {name.rsplit(".", 1)[0] for name in counters if name.endswith((".hit", ".miss"))}
+    stats = {}
+    for cache in sorted(caches):
+        hits, misses = counters.get(f"{cache}.hit", 0), counters.get(f"{cache}.miss", 0)
+        stats[cache] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+    return stats
+
+
+def snapshot():
+    """
+    Returns the recorded statistics.
+
+    Returns
+    -------
+    stats : dict
+        "stages" (calls, total, mean and max seconds and the memory high-water mark in bytes above the
+        memory in use when the stage started, None without memory tracking), "counters", "caches" and the
+        process-wide tracemalloc peak.
+    """
+    with _lock:
+        stages = {name: {"calls": calls, "total_seconds": total, "mean_seconds": total / calls, "max_seconds": longest,
+                         "peak_memory_bytes": memory}
+                  for name, (calls, total, longest, memory) in _stages.items()}
+        counters = dict(_counters)
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "enabled": _enabled,
+        "stages": stages,
+        "counters": counters,
+        "caches": cache_stats(),
+        "traced_memory_peak_bytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+    }
+
+
+def export_json(path=None):
+    """Returns the snapshot as JSON, appended as one line to path when given (JSON lines for aggregation)."""
+    record = json.dumps(snapshot())
+    if path is not None:
+        with open(path, "a") as file:
+            file.write(record + "\n")
+    return record
+
+
+def log_snapshot(level=logging.INFO):
+    """Writes the snapshot as one structured JSON log record."""
+    logger.log(level, export_json())
+
+
+def stages_frame():
+    """Stage statistics as a DataFrame sorted by total time."""
+    import pandas as pd
+
+    stages = snapshot()["stages"]
+    frame = pd.DataFrame.from_dict(stages, orient="index", columns=["calls", "total_seconds", "mean_seconds", "max_seconds", "peak_memory_bytes"])
+    return frame.sort_values("total_seconds", ascending=False)
+
+
+def diagnostics_panel():
+    """Shows the statistics in a Streamlit expander at the end of a page, nothing when instrumentation is disabled."""
+    if not _enabled:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    with st.expander("Diagnostics"):
+        st.caption("Process-wide statistics since the server started or the last reset.")
+        st.dataframe(stages_frame(), use_container_width=True)
+        caches = cache_stats()
+        if caches:
+            st.dataframe(pd.DataFrame.from_dict(caches, orient="index"), use_container_width=True)
+        counters = snapshot()["counters"]
+        if counters:
+            st.json(counters)
+        col1, col2 = st.columns(2)
+        col1.download_button("Export JSON", export_json(), file_name="diagnostics.json", mime="application/json")
+        if col2.button("Reset"):
+            reset()
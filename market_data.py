@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import warnings
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from cachetools import LRUCache
+from instrumentation import cache_event, count, stage
+
+CACHE_DIR = os.environ.get("QF_MARKET_DATA_DIR", os.path.join(os.path.expanduser("~"), ".qf_market_data"))
+MEMORY_CACHE_SIZE = 256  # Number of tickers kept in memory
+
+_memory_cache = LRUCache(maxsize=MEMORY_CACHE_SIZE)
+_lock = threading.Lock()
+_default_fetcher = None
+
+
+def yahoo_fetcher(tickers, start, end):
+    """
+    Downloads adjusted close prices for several tickers from Yahoo Finance in a single request.
+
+    Parameters
+    ----------
+    tickers : list of str
+        Ticker symbols to download.
+    start, end : pandas.Timestamp
+        Date range to download, end excluded.
+
+    Returns
+    -------
+    prices : pandas.DataFrame
+        Close prices indexed by date with one column per ticker.
+    """
+    import yfinance as yf
+
+    data = yf.download(list(tickers), start=start, end=end, auto_adjust=True, progress=False)["Close"]
+    if isinstance(data, pd.Series):
+        data = data.to_frame(tickers[0])
+    return data
+
+yahoo_fetcher.source_id = "yahoo"
+
+
+def local_file_fetcher(path):
+    """
+    Creates a fetcher that reads close prices from local files instead of the network.
+
+    Parameters
+    ----------
+    path : str
+        Either a CSV/Parquet file with a date index and one column per ticker, or a directory
+        holding one "<ticker>.csv" or "<ticker>.parquet" file per ticker with a date index and a
+        "Close" column.
+
+    Returns
+    -------
+    fetcher : callable
+        Fetcher with the same signature as yahoo_fetcher, its prices are cached apart from other sources.
+
+    Examples
+    --------
+    >>> set_default_fetcher(local_file_fetcher("tests/data/prices.parquet"))
+    """
+    def read(file):
+        if file.endswith(".parquet"):
+            frame = pd.read_parquet(file)
+        else:
+            frame = pd.read_csv(file, index_col=0, parse_dates=True)
+        frame.index = pd.to_datetime(frame.index)
+        return frame
+
+    def fetch(tickers, start, end):
+        if os.path.isdir(path):
+            columns = {}
+            for ticker in tickers:
+                for extension in (".parquet", ".csv"):
+                    file = os.path.join(path, ticker + extension)
+                    if os.path.exists(file):
+                        columns[ticker] = read(file)["Close"]
+                        break
+            frame = pd.DataFrame(columns)
+        else:
+            frame = read(path)
+            frame = frame[[ticker for ticker in tickers if ticker in frame.columns]]
+        return frame[(frame.index >= start) & (frame.index < end)]
+
+    path = os.path.abspath(path)
+    fetch.source_id = "local_" + hashlib.sha1(path.encode()).hexdigest()[:12]
+    return fetch
+
+
+def set_default_fetcher(fetcher):
+    """Sets the fetcher used when none is passed, None restores Yahoo Finance (or QF_MARKET_DATA_SOURCE if set)."""
+    global _default_fetcher
+    _default_fetcher = fetcher
+    clear_memory_cache()
+
+
+def get_default_fetcher():
+    """Returns the fetcher used when none is passed."""
+    if _default_fetcher is not None:
+        return _default_fetcher
+    if os.environ.get("QF_MARKET_DATA_SOURCE"):
+        return local_file_fetcher(os.environ["QF_MARKET_DATA_SOURCE"])
+    return yahoo_fetcher
+
+
+def clear_memory_cache():
+    """Empties the in-memory LRU, the on-disk store is kept."""
+    with _lock:
+        _memory_cache.clear()
+
+
+def _source_id(fetcher):
+    """Name of the store of a fetcher, None for fetchers without a source_id whose prices are not cached."""
+    source_id = getattr(fetcher, "source_id", None)
+    return None if source_id is None else re.sub(r"[^\w.\-]", "_", str(source_id))
+
+
+def _store_path(cache_dir, source_id, ticker):
+    return os.path.join(cache_dir, source_id, re.sub(r"[^\w.\-^=]", "_", ticker) + ".parquet")
+
+
+def _normalise(prices):
+    prices = prices.astype(float)
+    prices.index = pd.to_datetime(prices.index)
+    if prices.index.tz is not None:
+        prices.index = prices.index.tz_localize(None)
+    prices.index.name = "Date"
+    return prices[~prices.index.duplicated(keep="last")].sort_index()
+
+
+def _load(cache_dir, source_id, ticker):
+    """Returns (close prices, covered start, covered end) for a ticker, from memory or disk."""
+    key = (cache_dir, source_id, ticker)
+    with _lock:
+        if key in _memory_cache:
+            cache_event("market_data.memory", hit=True)
+            return _memory_cache[key]
+    cache_event("market_data.memory", hit=False)
+
+    path = _store_path(cache_dir, source_id, ticker)
+    if not os.path.exists(path):
+        cache_event("market_data.disk", hit=False)
+        return None
+    cache_event("market_data.disk", hit=True)
+    table = pq.read_table(path)
+    start, end = json.loads(table.schema.metadata[b"coverage"])
+    entry = (table.to_pandas()["Close"], pd.Timestamp(start), pd.Timestamp(end))
+    with _lock:
+        _memory_cache[key] = entry
+    return entry
+
+
+def _save(cache_dir, source_id, ticker, prices, start, end):
+    path = _store_path(cache_dir, source_id, ticker)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(prices.to_frame("Close"))
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"coverage"] = json.dumps([start.isoformat(), end.isoformat()]).encode()
+    # Temporary file unique to the process and thread, as batch workers may store the same ticker concurrently
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), tmp)
+    os.replace(tmp, path)
+    with _lock:
+        _memory_cache[(cache_dir, source_id, ticker)] = (prices, start, end)
+
+
+def get_close_prices(tickers, start, end, fetcher=None, cache_dir=None):
+    """
+    Gets adjusted close prices, only fetching the dates missing from the local cache.
+
+    Parameters
+    ----------
+    tickers : str or list of str
+        A ticker symbol or a list of ticker symbols.
+    start, end : str, date or pandas.Timestamp
+        Date range, end excluded (same convention as yf.download).
+    fetcher : callable, optional
+        fetcher(tickers, start, end) returning a DataFrame with one column per ticker,
+        defaults to get_default_fetcher(). Prices are only cached for fetchers with a source_id attribute.
+    cache_dir : str, optional
+        Directory of the Parquet store, defaults to CACHE_DIR.
+
+    Returns
+    -------
+    prices : pandas.Series or pandas.DataFrame
+        A Series when a single ticker string is passed, otherwise a DataFrame with one column per ticker.
+
+    Notes
+    -----
+    Each ticker is stored in its own Parquet file, under a directory per price source, together with
+    the date range already fetched. On a request, only the parts of [start, end) outside that range
+    are fetched, and tickers missing the same range are fetched together in one call. A range is only
+    marked as covered when the fetcher returned prices for it, so a failed download is retried on the
+    next request, and dates from today onwards are never marked as covered so the latest prices are
+    refreshed.
+    """
+    fetcher = get_default_fetcher() if fetcher is None else fetcher
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    source_id = _source_id(fetcher)
+    single = isinstance(tickers, str)
+    tickers = [tickers] if single else list(tickers)
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    covered_end = min(end, pd.Timestamp.today().normalize())
+
+    if source_id is None:
+        data = fetcher(tickers, start, end)
+        columns = {ticker: _normalise(data[ticker].dropna()) if ticker in data.columns else
+                   pd.Series(dtype=float, index=pd.DatetimeIndex([], name="Date")) for ticker in tickers}
+        for ticker in tickers:
+            if columns[ticker].empty:
+                warnings.warn(f"No prices returned for {ticker} between {start.date()} and {end.date()}")
+        if single:
+            return columns[tickers[0]].rename(tickers[0])
+        return pd.DataFrame(columns)
+
+    # Work out the missing date ranges of every ticker and group tickers by range
+    cached, stale, requests = {}, set(), {}
+    for ticker in tickers:
+        entry = _load(cache_dir, source_id, ticker)
+        cached[ticker] = entry
+        if entry is None:
+            missing = [(start, end)]
+        else:
+            missing = [r for r in ((start, entry[1]), (entry[2], end)) if r[0] < r[1]]
+        if missing:
+            stale.add(ticker)
+        for date_range in missing:
+            requests.setdefault(date_range, []).append(ticker)
+
+    # Ranges that returned no prices (e.g. a failed or rate limited download) are not recorded as covered
+    fetched = {ticker: [] for ticker in tickers}
+    returned = {ticker: set() for ticker in tickers}
+    for date_range, group in requests.items():
+        with stage("market_data.fetch"):
+            data = fetcher(group, *date_range)
+        count("market_data.fetched_tickers", len(group))
+        for ticker in group:
+            if ticker in data.columns and data[ticker].notna().any():
+                fetched[ticker].append(data[ticker].dropna())
+                returned[ticker].add(date_range)
+
+    columns = {}
+    for ticker in tickers:
+        entry = cached[ticker]
+        prices = entry[0] if entry is not None else pd.Series(dtype=float, index=pd.DatetimeIndex([], name="Date"))
+        if returned[ticker]:
+            prices = _normalise(pd.concat([prices] + fetched[ticker]))
+            if entry is None:
+                new_start, new_end = start, covered_end
+            else:
+                new_start = start if (start, entry[1]) in returned[ticker] else entry[1]
+                new_end = max(covered_end, entry[2]) if (entry[2], end) in returned[ticker] else entry[2]
+            _save(cache_dir, source_id, ticker, prices, new_start, max(new_end, new_start))
+        columns[ticker] = prices[(prices.index >= start) & (prices.index < end)]
+        if ticker in stale and columns[ticker].empty:
+            warnings.warn(f"No prices returned for {ticker} between {start.date()} and {end.date()}")
+
+    if single:
+        return columns[tickers[0]].rename(tickers[0])
+    return pd.DataFrame(columns)
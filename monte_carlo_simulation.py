@@ -1,21 +1,632 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-import math
+from scipy.special import ndtri
+from bs_pricer import blackScholes, bs_chain
+from instrumentation import stage
+
+TRADING_DAYS = 252  # Number of trading days in a year
+DEFAULT_CHUNK_SIZE = 2**14  # Paths simulated per batch and pool task, small enough to keep many workers busy
+VARIANCE_REDUCTION_MODES = ("antithetic", "control_variate", "moment_matching")
+MOMENT_MATCHING_BATCHES = 20  # Independently matched batches per chunk, used for the standard error
+MOMENT_MATCHING_MIN_BATCH = 5_000  # Draws per matched batch, rescaling by the batch std biases the price by O(1 / batch size)
+SAMPLERS = ("pseudo", "sobol")
+QMC_REPLICATES = 16  # Independently scrambled Sobol sequences, used for the standard error
+PATH_CHUNK_ELEMENTS = 5_000_000  # Maximum prices held per chunk when full paths are simulated
+LSM_EXERCISE_DATES = 50  # Exercise opportunities of the Longstaff-Schwartz American pricer
+LSM_TRAINING_PATHS = 50_000  # Paths used to fit the exercise boundary
+LSM_BASIS_DEGREE = 3  # Degree of the polynomial regression basis
+GREEKS = ("price", "delta", "gamma", "vega", "theta", "rho")
+DEFAULT_BUMPS = {"spot": 0.01, "volatility": 0.001, "rate": 0.0001, "time": 1 / 365}  # Spot bump is relative, the others absolute
 
-# Function to calculate the option payoff based on option type
+# Function to calculate the option payoff based on option type (works on scalars and arrays)
 def calculate_option_payoff(option_type, stock_price, strike_price):
     if option_type == "Call":
-        return max(stock_price - strike_price, 0)
+        return np.maximum(stock_price - strike_price, 0)
     elif option_type == "Put":
-        return max(strike_price - stock_price, 0)
+        return np.maximum(strike_price - stock_price, 0)
+
+# Function to get the number of time steps for a given maturity
+def _num_steps(time_to_maturity):
+    return max(int(TRADING_DAYS * time_to_maturity), 1)
+
+# Function to split a number of paths into balanced chunk sizes of at most chunk_size
+def _chunk_sizes(num_simulations, chunk_size):
+    num_chunks = -(-int(num_simulations) // int(chunk_size))
+    return [len(c) for c in np.array_split(np.empty(int(num_simulations), dtype=bool), num_chunks)]
+
+# Function to create one independent seed per chunk from a single seed
+def _chunk_seeds(seed, num_chunks):
+    return np.random.SeedSequence(seed).spawn(num_chunks)
+
+# Function to build GBM price paths from a (paths x steps) matrix of standard normal draws
+def _paths_from_normals(stock_price, volatility, risk_free_rate, time_to_maturity, normals):
+    dt = time_to_maturity / normals.shape[1]
+    log_paths = normals * (volatility * np.sqrt(dt))
+    log_paths += (risk_free_rate - 0.5 * volatility**2) * dt
+    np.cumsum(log_paths, axis=1, out=log_paths)
+    np.exp(log_paths, out=log_paths)
+    log_paths *= stock_price
+    return log_paths
+
+# Function to build GBM terminal prices from a vector of standard normal draws
+def _terminal_from_normals(stock_price, volatility, risk_free_rate, time_to_maturity, normals):
+    drift = (risk_free_rate - 0.5 * volatility**2) * time_to_maturity
+    return stock_price * np.exp(drift + volatility * np.sqrt(time_to_maturity) * normals)
+
+# Function to simulate full GBM price paths for a batch of paths
+def simulate_price_paths(stock_price, volatility, risk_free_rate, time_to_maturity, num_simulations, rng=None, num_steps=None):
+    """ Returns a (num_simulations x num_steps) matrix of simulated prices
+
+    Parameters
+    ----------
+    stock_price : float
+        Spot price
+    volatility : float
+        Annualised volatility
+    risk_free_rate : float
+        Annualised risk free rate
+    time_to_maturity : float
+        TTM in years
+    num_simulations : int
+        Number of paths
+    rng : np.random.Generator, optional
+        Random generator, a fresh unseeded one is used if omitted
+    num_steps : int, optional
+        Number of time steps, defaults to one per trading day
+
+    Returns
+    ----------
+    price_paths : np.array
+        Prices at the end of each time step, one row per path
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    num_steps = _num_steps(time_to_maturity) if num_steps is None else num_steps
+    normals = rng.standard_normal((int(num_simulations), num_steps))
+    return _paths_from_normals(stock_price, volatility, risk_free_rate, time_to_maturity, normals)
+
+# Function to simulate GBM terminal prices only, without building the paths
+def simulate_terminal_prices(stock_price, volatility, risk_free_rate, time_to_maturity, num_simulations, rng=None):
+    """ Returns num_simulations terminal prices drawn exactly from the GBM distribution at maturity """
+    rng = np.random.default_rng() if rng is None else rng
+    normals = rng.standard_normal(int(num_simulations))
+    return _terminal_from_normals(stock_price, volatility, risk_free_rate, time_to_maturity, normals)
+
+# Function to check and normalise the requested variance reduction modes
+def _variance_reduction_modes(variance_reduction):
+    if variance_reduction is None:
+        return ()
+    modes = (variance_reduction,) if isinstance(variance_reduction, str) else tuple(variance_reduction)
+    for mode in modes:
+        if mode not in VARIANCE_REDUCTION_MODES:
+            raise ValueError(f"Unknown variance reduction mode '{mode}', expected one of {VARIANCE_REDUCTION_MODES}")
+    return modes
+
+# Function to get the number of moment matched batches in a chunk, each batch holds at least MOMENT_MATCHING_MIN_BATCH draws
+def _num_batches(num_draws):
+    return max(min(MOMENT_MATCHING_BATCHES, num_draws // MOMENT_MATCHING_MIN_BATCH), 1)
+
+# Function to draw the standard normals of one chunk, moment matched if requested
+def _draw_normals(rng, num_paths, num_steps, modes):
+    shape = (num_paths,) if num_steps is None else (num_paths, num_steps)
+    normals = rng.standard_normal(shape)
+    if "moment_matching" in modes and num_paths > 1:
+        # Each batch of paths is matched separately so batch means stay independent for the standard error
+        for batch in np.array_split(normals, _num_batches(num_paths)):
+            batch -= batch.mean(axis=0)
+            batch /= batch.std(axis=0)
+    return normals
+
+# Function to collapse per-path values into the independent sampling units of the estimator
+def _sampling_units(values, modes):
+    if "antithetic" in modes:
+        values = values.reshape(2, -1).mean(axis=0)
+    if "moment_matching" in modes:
+        values = np.array([batch.mean() for batch in np.array_split(values, _num_batches(len(values)))])
+    return values
+
+# Function to price the simulated normals, returning discounted payoffs and control variate payoffs (None if unused)
+def _discounted_payoffs(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity,
+                        normals, terminal_only, modes, control_strike, payoff=None):
+    discount = np.exp(-risk_free_rate * time_to_maturity)
+    if terminal_only:
+        terminal_prices = _terminal_from_normals(stock_price, volatility, risk_free_rate, time_to_maturity, normals)
+        payoffs = discount * calculate_option_payoff(option_type, terminal_prices, strike_price)
+    else:
+        price_paths = _paths_from_normals(stock_price, volatility, risk_free_rate, time_to_maturity, normals)
+        terminal_prices = price_paths[:, -1]
+        if payoff is None:
+            payoffs = discount * calculate_option_payoff(option_type, terminal_prices, strike_price)
+        else:
+            # Path payoffs also see the spot, e.g. a barrier already breached at valuation
+            spots = np.full((len(price_paths), 1), stock_price)
+            payoffs = discount * payoff(np.concatenate([spots, price_paths], axis=1))
+        del price_paths
+    controls = None
+    if "control_variate" in modes:
+        # Discounted terminal price (mean stock_price), or a European option when a control strike is given
+        control = terminal_prices if control_strike is None else calculate_option_payoff(option_type, terminal_prices, control_strike)
+        controls = discount * control
+    return payoffs, controls
+
+# Function to simulate one chunk and return the running sums it contributes to the estimator
+def _chunk_sums(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity,
+                num_paths, rng, terminal_only, modes, control_strike, payoff=None):
+    """ Returns [paths, sum, sum of squares] of the plain payoffs followed by
+    [units, sum Y, sum Y^2, sum X, sum X^2, sum XY] of the sampling units Y and their controls X """
+    num_steps = None if terminal_only else _num_steps(time_to_maturity)
+    antithetic = "antithetic" in modes
+    normals = _draw_normals(rng, num_paths // 2 if antithetic else num_paths, num_steps, modes)
+    if antithetic:
+        normals = np.concatenate([normals, -normals])
+
+    payoffs, controls = _discounted_payoffs(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity,
+                                            normals, terminal_only, modes, control_strike, payoff)
+    units = _sampling_units(payoffs, modes)
+    controls = _sampling_units(controls, modes) if controls is not None else np.zeros_like(units)
+
+    return np.array([len(payoffs), payoffs.sum(), np.dot(payoffs, payoffs),
+                     len(units), units.sum(), np.dot(units, units), controls.sum(), np.dot(controls, controls), np.dot(units, controls)])
+
+# Function run by the worker processes, simulates one chunk from its own seed
+def _chunk_task(args):
+    *inputs, seed_sequence, terminal_only, modes, control_strike, payoff = args
+    return _chunk_sums(*inputs, np.random.default_rng(seed_sequence), terminal_only, modes, control_strike, payoff)
+
+# Function to get the order in which a Brownian bridge fills the time steps of a path
+def _brownian_bridge_plan(num_steps):
+    """ Returns (target, left, right) step indices, the terminal step first then recursive midpoints, index 0 being W(0) = 0 """
+    plan = [(num_steps, 0, num_steps)]
+    intervals = [(0, num_steps)]
+    while intervals:
+        next_intervals = []
+        for left, right in intervals:
+            if right - left > 1:
+                middle = (left + right) // 2
+                plan.append((middle, left, right))
+                next_intervals += [(left, middle), (middle, right)]
+        intervals = next_intervals
+    return plan
+
+# Function to turn a (paths x steps) matrix of normals into Brownian bridge increments, one normal per step
+def _brownian_bridge(normals):
+    num_paths, num_steps = normals.shape
+    walk = np.zeros((num_paths, num_steps + 1))  # Brownian motion in units of one time step
+    for column, (target, left, right) in enumerate(_brownian_bridge_plan(num_steps)):
+        if target == right:
+            walk[:, target] = np.sqrt(num_steps) * normals[:, column]
+        else:
+            weight = (target - left) / (right - left)
+            std = np.sqrt((target - left) * (right - target) / (right - left))
+            walk[:, target] = (1 - weight) * walk[:, left] + weight * walk[:, right] + std * normals[:, column]
+    return np.diff(walk, axis=1)
+
+# Function to simulate one randomised QMC replicate and return its running sums, the replicate mean being one sampling unit
+def _qmc_replicate_task(args):
+    from scipy.stats import qmc
+
+    *inputs, num_paths, seed_sequence, terminal_only, modes, control_strike, payoff, chunk_size = args
+    time_to_maturity = inputs[-1]
+    num_steps = None if terminal_only else _num_steps(time_to_maturity)
+    sampler = qmc.Sobol(d=1 if terminal_only else num_steps, scramble=True, seed=np.random.default_rng(seed_sequence))
+
+    plain = np.zeros(3)
+    control_sum = 0.0
+    for n in _chunk_sizes(num_paths, chunk_size):
+        normals = ndtri(sampler.random(n))
+        normals = normals[:, 0] if terminal_only else _brownian_bridge(normals)
+        payoffs, controls = _discounted_payoffs(*inputs, normals, terminal_only, modes, control_strike, payoff)
+        plain += [n, payoffs.sum(), np.dot(payoffs, payoffs)]
+        control_sum += controls.sum() if controls is not None else 0.0
+
+    mean_y, mean_x = plain[1] / plain[0], control_sum / plain[0]
+    return np.concatenate([plain, [1, mean_y, mean_y**2, mean_x, mean_x**2, mean_y * mean_x]])
+
+# Function to turn the accumulated running sums into a price, standard error and variance reduction factor
+def _summarise(sums, control_mean=None):
+    num_paths, total, total_sq, n, sum_y, sum_yy, sum_x, sum_xx, sum_xy = sums
+    mean_y, mean_x = sum_y / n, sum_x / n
+    var_y = max(sum_yy / n - mean_y**2, 0.0)
+    price = mean_y
+
+    if control_mean is not None:
+        var_x = max(sum_xx / n - mean_x**2, 0.0)
+        cov_xy = sum_xy / n - mean_x * mean_y
+        beta = cov_xy / var_x if var_x > 0 else 0.0
+        price = mean_y - beta * (mean_x - control_mean)
+        var_y = max(var_y - beta * cov_xy, 0.0)
+
+    # A single sampling unit says nothing about the error
+    estimator_variance = var_y / (n - 1) if n > 1 else np.nan
+    plain_mean = total / num_paths
+    plain_variance = max(total_sq / num_paths - plain_mean**2, 0.0) / (num_paths - 1) if num_paths > 1 else np.nan
+    factor = plain_variance / estimator_variance if estimator_variance > 0 else np.nan
+
+    return {"price": float(price), "std_error": float(np.sqrt(estimator_variance)), "num_simulations": int(num_paths),
+            "variance_reduction_factor": float(factor)}
+
+# Function to price an option by Monte Carlo in fixed-size chunks
+def monte_carlo_price(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations,
+                      seed=None, chunk_size=DEFAULT_CHUNK_SIZE, terminal_only=True, variance_reduction=None, control_strike=None,
+                      workers=None, sampler="pseudo", qmc_replicates=QMC_REPLICATES, payoff=None):
+    """ Returns a Monte Carlo option price together with its standard error
+
+    Parameters
+    ----------
+    option_type : string
+        "Call" or "Put"
+    stock_price : float
+        Spot price
+    strike_price : float
+        Option strike price
+    volatility : float
+        Annualised volatility
+    risk_free_rate : float
+        Annualised risk free rate
+    time_to_maturity : float
+        TTM in years
+    num_simulations : int
+        Number of paths, rounded up to an even number with antithetic variates
+    seed : int, optional
+        Seed for reproducible results
+    chunk_size : int, optional
+        Number of paths held in memory at once
+    terminal_only : bool, optional
+        Draw terminal prices directly instead of stepping through every trading day
+    variance_reduction : string or list of strings, optional
+        Any of "antithetic", "control_variate" and "moment_matching"
+    control_strike : float, optional
+        Strike of a European option used as control variate instead of the discounted terminal price
+    workers : int, optional
+        Number of worker processes, None or 1 runs in this process and -1 uses every core
+    sampler : string, optional
+        "pseudo" for pseudo-random normals or "sobol" for randomised quasi-Monte Carlo
+    qmc_replicates : int, optional
+        Number of independently scrambled Sobol sequences when sampler is "sobol"
+    payoff : callable, optional
+        Path-dependent payoff from the payoffs module (e.g. payoffs.asian("Call", 100)), evaluated on
+        every chunk of simulated paths with the spot as first column. option_type and strike_price then only set the control variate.
+
+    Returns
+    ----------
+    result : dict
+        "price", "std_error", "num_simulations" and "variance_reduction_factor", the last two
+        being NaN when there is a single sampling unit
+
+    Notes
+    ----------
+    Paths are processed chunk by chunk and only running sums are kept, so memory
+    is bounded by chunk_size whatever the number of paths. When full paths are
+    simulated a chunk holds at most PATH_CHUNK_ELEMENTS prices. Each chunk draws from
+    its own stream spawned from the seed with SeedSequence.spawn and the chunk sums
+    are reduced in chunk order, so a given seed gives the same result whatever the
+    number of workers. Every chunk is one pool task, and the default chunk size is
+    small and fixed rather than derived from workers so that a million paths give
+    enough tasks for many cores without changing the result. Moment matched batches
+    are sized by MOMENT_MATCHING_MIN_BATCH and not by the chunk, so smaller chunks
+    only mean fewer batches per chunk and never a larger rescaling bias.
+
+    The variance reduction factor is the variance a plain estimator would have with
+    the same number of paths divided by the variance achieved. Antithetic variates
+    average each path with its mirror, moment matching rescales the normal draws of
+    each batch to mean 0 and variance 1 (the standard error then comes from the batch
+    means, and batches hold at least MOMENT_MATCHING_MIN_BATCH draws whatever the
+    chunk_size, which keeps the O(1 / batch size) bias of the rescaling below the
+    noise) and the control variate regresses the payoff on the discounted terminal
+    price, whose mean is the spot, or on a European option priced in closed form by
+    bs_pricer.blackScholes when control_strike is given (e.g. a nearby strike, or the
+    option's own strike for a path-dependent payoff). Antithetic chunks hold whole
+    pairs, so an odd number of paths gets one more path.
+
+    With the "sobol" sampler each replicate is a scrambled Sobol sequence (scipy.stats.qmc)
+    of 2^k points, k being the smallest with qmc_replicates * 2^k >= num_simulations.
+    Paths are built with a Brownian bridge so the first Sobol dimensions drive the
+    terminal price, and the standard error comes from the spread of the replicate means.
+    Only the control variate can be combined with it.
+    """
+    modes = _variance_reduction_modes(variance_reduction)
+    if "control_variate" in modes and payoff is None and control_strike == strike_price:
+        raise ValueError("A European control with the option's own strike is the payoff itself, use another control_strike")
+    terminal_only = terminal_only and payoff is None
+    if not terminal_only:
+        chunk_size = max(min(chunk_size, PATH_CHUNK_ELEMENTS // _num_steps(time_to_maturity)), 1)
+    inputs = (option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity)
+
+    if sampler == "pseudo":
+        if "antithetic" in modes:
+            # Chunks of whole antithetic pairs
+            sizes = [2 * n for n in _chunk_sizes(-(-int(num_simulations) // 2), max(chunk_size // 2, 1))]
+        else:
+            sizes = _chunk_sizes(num_simulations, chunk_size)
+        task = _chunk_task
+        tasks = [(*inputs, n, seed_sequence, terminal_only, modes, control_strike, payoff)
+                 for n, seed_sequence in zip(sizes, _chunk_seeds(seed, len(sizes)))]
+    elif sampler == "sobol":
+        if set(modes) - {"control_variate"}:
+            raise ValueError("Only the control variate can be combined with the sobol sampler")
+        points = 2 ** int(np.ceil(np.log2(max(int(num_simulations) / qmc_replicates, 1))))
+        task = _qmc_replicate_task
+        tasks = [(*inputs, points, seed_sequence, terminal_only, modes, control_strike, payoff, chunk_size)
+                 for seed_sequence in _chunk_seeds(seed, qmc_replicates)]
+    else:
+        raise ValueError(f"Unknown sampler '{sampler}', expected one of {SAMPLERS}")
+
+    workers = os.cpu_count() if workers == -1 else workers
+    if workers is None or workers <= 1 or len(tasks) == 1:
+        partial_sums = map(task, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            partial_sums = list(executor.map(task, tasks))
+
+    sums = np.zeros(9)
+    for chunk in partial_sums:
+        sums += chunk
+
+    control_mean = None
+    if "control_variate" in modes:
+        control_mean = stock_price if control_strike is None else blackScholes(risk_free_rate, stock_price, control_strike,
+                                                                               time_to_maturity, volatility, option_type)
+    return _summarise(sums, control_mean)
+
+# Function to get the Longstaff-Schwartz regression basis, polynomials in moneyness
+def _lsm_basis(prices, strike_price, degree):
+    return np.polynomial.polynomial.polyvander(prices / strike_price, degree)
+
+# Function to fit the continuation value regressions of the Longstaff-Schwartz algorithm by backward induction
+def _lsm_fit(option_type, strike_price, price_paths, step_discount, degree):
+    """ Returns one coefficient vector per exercise date before maturity, None where too few paths are in the money """
+    cash_flows = calculate_option_payoff(option_type, price_paths[:, -1], strike_price)
+    coefficients = [None] * (price_paths.shape[1] - 1)
+    for date in range(price_paths.shape[1] - 2, -1, -1):
+        cash_flows *= step_discount
+        exercise = calculate_option_payoff(option_type, price_paths[:, date], strike_price)
+        in_the_money = np.flatnonzero(exercise > 0)
+        if len(in_the_money) <= degree + 1:
+            continue
+        basis = _lsm_basis(price_paths[in_the_money, date], strike_price, degree)
+        coefficients[date] = np.linalg.lstsq(basis, cash_flows[in_the_money], rcond=None)[0]
+        stop = exercise[in_the_money] > basis @ coefficients[date]
+        cash_flows[in_the_money[stop]] = exercise[in_the_money[stop]]
+    return coefficients
+
+# Function run by the worker processes, prices one chunk of independent paths with a fitted exercise boundary
+def _lsm_chunk_task(args):
+    option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_paths, seed_sequence, coefficients, degree = args
+    exercise_dates = len(coefficients) + 1
+    rng = np.random.default_rng(seed_sequence)
+    price_paths = simulate_price_paths(stock_price, volatility, risk_free_rate, time_to_maturity, num_paths, rng, exercise_dates)
+    step_discount = np.exp(-risk_free_rate * time_to_maturity / exercise_dates)
+
+    values = calculate_option_payoff(option_type, price_paths[:, -1], strike_price) * step_discount**exercise_dates
+    alive = np.ones(num_paths, dtype=bool)
+    for date, coefficient in enumerate(coefficients):
+        if coefficient is None:
+            continue
+        exercise = calculate_option_payoff(option_type, price_paths[:, date], strike_price)
+        candidates = np.flatnonzero(alive & (exercise > 0))
+        continuation = _lsm_basis(price_paths[candidates, date], strike_price, degree) @ coefficient
+        stop = candidates[exercise[candidates] > continuation]
+        values[stop] = exercise[stop] * step_discount**(date + 1)
+        alive[stop] = False
+
+    return np.array([num_paths, values.sum(), np.dot(values, values), num_paths, values.sum(), np.dot(values, values), 0, 0, 0])
+
+# Function to price an American option by Monte Carlo with the Longstaff-Schwartz algorithm
+def monte_carlo_american_price(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations,
+                               seed=None, chunk_size=DEFAULT_CHUNK_SIZE, exercise_dates=LSM_EXERCISE_DATES,
+                               training_paths=LSM_TRAINING_PATHS, basis_degree=LSM_BASIS_DEGREE, workers=None):
+    """ Returns a Longstaff-Schwartz American option price together with its standard error
+
+    Parameters
+    ----------
+    option_type : string
+        "Call" or "Put"
+    stock_price : float
+        Spot price
+    strike_price : float
+        Option strike price
+    volatility : float
+        Annualised volatility
+    risk_free_rate : float
+        Annualised risk free rate
+    time_to_maturity : float
+        TTM in years
+    num_simulations : int
+        Number of pricing paths
+    seed : int, optional
+        Seed for reproducible results
+    chunk_size : int, optional
+        Number of pricing paths held in memory at once
+    exercise_dates : int, optional
+        Number of equally spaced exercise dates, the last one being maturity
+    training_paths : int, optional
+        Number of paths used to fit the exercise boundary
+    basis_degree : int, optional
+        Degree of the polynomial regression on moneyness
+    workers : int, optional
+        Number of worker processes, None or 1 runs in this process and -1 uses every core
+
+    Returns
+    ----------
+    result : dict
+        "price", "std_error", "num_simulations", "variance_reduction_factor",
+        "european_price" (closed form) and "early_exercise_premium"
+
+    Notes
+    ----------
+    The continuation values are regressed on a separate set of training paths by
+    backward induction. The fitted exercise rule is then applied to independent
+    pricing paths streamed in chunks, so the full path matrix never sits in memory
+    and the estimate is a low-biased price of the Bermudan option with exercise_dates
+    exercise opportunities.
+    """
+    training_seed, *chunk_seeds = _chunk_seeds(seed, 1 + len(_chunk_sizes(num_simulations, chunk_size)))
+    training = simulate_price_paths(stock_price, volatility, risk_free_rate, time_to_maturity, training_paths,
+                                    np.random.default_rng(training_seed), exercise_dates)
+    step_discount = np.exp(-risk_free_rate * time_to_maturity / exercise_dates)
+    coefficients = _lsm_fit(option_type, strike_price, training, step_discount, basis_degree)
+    del training
+
+    tasks = [(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, n, seed_sequence, coefficients, basis_degree)
+             for n, seed_sequence in zip(_chunk_sizes(num_simulations, chunk_size), chunk_seeds)]
+    workers = os.cpu_count() if workers == -1 else workers
+    if workers is None or workers <= 1 or len(tasks) == 1:
+        partial_sums = map(_lsm_chunk_task, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            partial_sums = list(executor.map(_lsm_chunk_task, tasks))
+
+    result = _summarise(sum(partial_sums, np.zeros(9)))
+    result["european_price"] = float(blackScholes(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type))
+    result["early_exercise_premium"] = result["price"] - result["european_price"]
+    return result
+
+# Function to get per-path pathwise / likelihood ratio greek estimates of a European option from its normal draws
+def _pathwise_greeks(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, normals):
+    sqrt_t = np.sqrt(time_to_maturity)
+    discount = np.exp(-risk_free_rate * time_to_maturity)
+    terminal_prices = _terminal_from_normals(stock_price, volatility, risk_free_rate, time_to_maturity, normals)
+    payoffs = calculate_option_payoff(option_type, terminal_prices, strike_price)
+
+    # Derivative of the payoff with respect to the terminal price
+    sign = 1.0 if option_type == "Call" else -1.0
+    slope = sign * (payoffs > 0)
+
+    return {
+        "price": discount * payoffs,
+        "delta": discount * slope * terminal_prices / stock_price,
+        # Pathwise delta differentiated by likelihood ratio, the payoff kink makes a pure pathwise gamma zero
+        "gamma": discount * slope * strike_price * normals / (stock_price**2 * volatility * sqrt_t),
+        "vega": discount * slope * terminal_prices * (sqrt_t * normals - volatility * time_to_maturity) * 0.01,
+        "theta": -(discount * slope * terminal_prices * (risk_free_rate - volatility**2 / 2 + volatility * normals / (2 * sqrt_t))
+                   - risk_free_rate * discount * payoffs) / 365,
+        "rho": (discount * slope * terminal_prices * time_to_maturity - time_to_maturity * discount * payoffs) * 0.01,
+    }
+
+# Function to get per-path bump and revalue greek estimates, every bumped scenario reuses the same normal draws
+def _bumped_greeks(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, normals, payoff, bumps):
+    def value(spot=stock_price, vol=volatility, rate=risk_free_rate, ttm=time_to_maturity):
+        return _discounted_payoffs(option_type, spot, strike_price, vol, rate, ttm, normals, False, (), None, payoff)[0]
+
+    spot_bump = bumps["spot"] * stock_price
+    base, spot_up, spot_down = value(), value(spot=stock_price + spot_bump), value(spot=stock_price - spot_bump)
+    vol_bump, rate_bump, time_bump = bumps["volatility"], bumps["rate"], min(bumps["time"], time_to_maturity / 2)
+
+    return {
+        "price": base,
+        "delta": (spot_up - spot_down) / (2 * spot_bump),
+        "gamma": (spot_up - 2 * base + spot_down) / spot_bump**2,
+        "vega": (value(vol=volatility + vol_bump) - value(vol=volatility - vol_bump)) / (2 * vol_bump) * 0.01,
+        "theta": (value(ttm=time_to_maturity - time_bump) - base) / time_bump / 365,
+        "rho": (value(rate=risk_free_rate + rate_bump) - value(rate=risk_free_rate - rate_bump)) / (2 * rate_bump) * 0.01,
+    }
+
+# Function run by the worker processes, returns [paths, sum, sum of squares] of every greek estimator on one chunk
+def _greeks_chunk_task(args):
+    *inputs, num_paths, seed_sequence, payoff, bumps = args
+    rng = np.random.default_rng(seed_sequence)
+    if payoff is None:
+        estimates = _pathwise_greeks(*inputs, rng.standard_normal(num_paths))
+    else:
+        estimates = _bumped_greeks(*inputs, rng.standard_normal((num_paths, _num_steps(inputs[-1]))), payoff, bumps)
+    return np.array([[num_paths, estimates[greek].sum(), np.dot(estimates[greek], estimates[greek])] for greek in GREEKS])
+
+# Function to calculate option price and greeks from a single Monte Carlo simulation
+def monte_carlo_greeks(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations,
+                       seed=None, chunk_size=DEFAULT_CHUNK_SIZE, payoff=None, bumps=None, workers=None):
+    """ Returns a Monte Carlo price, delta, gamma, vega, theta and rho with their standard errors
+
+    Parameters
+    ----------
+    option_type : string
+        "Call" or "Put"
+    stock_price : float
+        Spot price
+    strike_price : float
+        Option strike price
+    volatility : float
+        Annualised volatility
+    risk_free_rate : float
+        Annualised risk free rate
+    time_to_maturity : float
+        TTM in years
+    num_simulations : int
+        Number of paths
+    seed : int, optional
+        Seed for reproducible results
+    chunk_size : int, optional
+        Number of paths held in memory at once
+    payoff : callable, optional
+        Path-dependent payoff from the payoffs module, greeks then come from bump and revalue
+    bumps : dict, optional
+        Bump sizes for "spot" (relative), "volatility", "rate" and "time" (absolute), see DEFAULT_BUMPS
+    workers : int, optional
+        Number of worker processes, None or 1 runs in this process and -1 uses every core
+
+    Returns
+    ----------
+    result : dict
+        "price", "delta", "gamma", "vega", "theta", "rho", "std_error" (a dict with the
+        standard error of each of them) and "num_simulations"
+
+    Notes
+    ----------
+    Units follow bs_pricer: vega and rho per 1% move, theta per calendar day.
+    European greeks use pathwise estimators on the terminal price, gamma being the
+    pathwise delta differentiated by likelihood ratio. Path-dependent payoffs are
+    revalued under central bumps of each input on the same normal draws (common random
+    numbers), so all greeks still come from one simulation.
+    """
+    bumps = {**DEFAULT_BUMPS, **(bumps or {})}
+    if payoff is not None:
+        chunk_size = max(min(chunk_size, PATH_CHUNK_ELEMENTS // (8 * _num_steps(time_to_maturity))), 1)
+    sizes = _chunk_sizes(num_simulations, chunk_size)
+    tasks = [(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, n, seed_sequence, payoff, bumps)
+             for n, seed_sequence in zip(sizes, _chunk_seeds(seed, len(sizes)))]
+
+    workers = os.cpu_count() if workers == -1 else workers
+    if workers is None or workers <= 1 or len(tasks) == 1:
+        partial_sums = map(_greeks_chunk_task, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            partial_sums = list(executor.map(_greeks_chunk_task, tasks))
+
+    n, total, total_sq = sum(partial_sums, np.zeros((len(GREEKS), 3))).T
+    means = total / n
+    std_errors = np.sqrt(np.maximum(total_sq / n - means**2, 0) / np.maximum(n - 1, 1))
+
+    result = {greek: float(mean) for greek, mean in zip(GREEKS, means)}
+    result["std_error"] = {greek: float(error) for greek, error in zip(GREEKS, std_errors)}
+    result["num_simulations"] = int(n[0])
+    return result
+
+# Function to compare Monte Carlo greeks of a European option with the closed form ones
+def monte_carlo_greeks_vs_bs(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations, seed=None, **kwargs):
+    """ Returns a DataFrame with the Monte Carlo estimate, its standard error, the bs_pricer value
+    and the z-score of the difference for the price and every greek """
+    import pandas as pd
+
+    mc = monte_carlo_greeks(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations, seed=seed, **kwargs)
+    bs = bs_chain(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type).iloc[0]
+    table = pd.DataFrame({
+        "Monte Carlo": [mc[greek] for greek in GREEKS],
+        "Std Error": [mc["std_error"][greek] for greek in GREEKS],
+        "Black-Scholes": [bs[greek] for greek in GREEKS],
+    }, index=pd.Index(GREEKS, name="Greek"))
+    table["Z-Score"] = (table["Monte Carlo"] - table["Black-Scholes"]) / table["Std Error"]
+    return table
 
 # Function to perform Monte Carlo simulation for option pricing and visualise results
-def monte_carlo_option_pricing(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations):
+def monte_carlo_option_pricing(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations, seed=None):
     """ Returns an option price and price paths
-    
+
     Parameters
     ----------
     option_type : string
-        The increment to downsample sigma
+        "Call" or "Put"
+    stock_price : float
+        Spot price
     strike_price : float
         Option strike price
     volatility : float
@@ -23,39 +634,30 @@ def monte_carlo_option_pricing(option_type, stock_price, strike_price, volatilit
     risk_free_rate : int
         risk free rate
     time_to_maturity : int
-        TTM    
+        TTM
     num_simulations : int
         Number of samples to create
-        
+    seed : int, optional
+        Seed for reproducible paths
+
     Returns
     ----------
     option_price : np.array
     paths_price : np.array
-    
+        (num_simulations x time steps) matrix of simulated prices
+
     Notes
     ----------
     This method returns option prices and paths.
-    This is achieved through a Monte Carlo simulation.
+    This is achieved through a Monte Carlo simulation of geometric Brownian
     motion. More information at:
     https://github.com/JKaterina/monte-carlo-python/blob/main/monte_carlo_sim.py
+    All paths are simulated at once, use monte_carlo_price when the paths are not needed.
     """
-    dt = time_to_maturity / 252  # Assuming 252 trading days in a year
-    option_payoffs = []
-    price_paths = []
-
-    for _ in range(num_simulations):
-        price_path = []
-        stock_price_copy = stock_price
-
-        for _ in range(int(252 * time_to_maturity)):
-            drift = (risk_free_rate - 0.5 * volatility**2) * dt
-            shock = volatility * math.sqrt(dt) * np.random.normal(0, 1)
-            stock_price_copy *= math.exp(drift + shock)
-            price_path.append(stock_price_copy)
-
-        price_paths.append(price_path)
-        option_payoff = calculate_option_payoff(option_type, stock_price_copy, strike_price)
-        option_payoffs.append(option_payoff)
+    with stage("monte_carlo.simulate"):
+        price_paths = simulate_price_paths(stock_price, volatility, risk_free_rate, time_to_maturity, num_simulations,
+                                           np.random.default_rng(seed))
+    option_payoffs = calculate_option_payoff(option_type, price_paths[:, -1], strike_price)
 
     option_price = np.exp(-risk_free_rate * time_to_maturity) * np.mean(option_payoffs)
-    return option_price, price_paths
\ No newline at end of file
+    return option_price, price_paths
@@ -1,7 +1,7 @@
 import streamlit as st
-from monte_carlo_simulation import monte_carlo_option_pricing
-import plotly.express as px
-import pandas as pd
+from app_cache import cached_monte_carlo
+from instrumentation import diagnostics_panel, stage
+import plotly.graph_objects as go
 
 # set layout to wide
 st.set_page_config(layout="wide")
@@ -20,19 +20,37 @@ with col1:
     time_to_maturity = st.number_input("Time to Maturity", value=1)  # Time to maturity in years
     num_simulations = st.number_input("Number of Simulations", value=10)
 
+    st.write("## Chart Settings")
+    max_paths = st.number_input("Paths Plotted", min_value=1, max_value=500, value=50)  # Random sample drawn individually
+    method = st.selectbox("Downsampling", ("lttb", "minmax"))  # Time step decimation
+
 with col2:
     st.write("## Output")
-    # Calculate the option price using Monte Carlo simulation and obtain price paths
-    option_price, price_paths = monte_carlo_option_pricing(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations)
+    # Calculate the option price using Monte Carlo simulation, the chart data is reduced on the server
+    option_price, bands, sample = cached_monte_carlo(option_type, stock_price, strike_price, volatility, risk_free_rate, time_to_maturity, num_simulations,
+                                                     max_paths=max_paths, method=method)
 
     st.metric("The estimated option price is: ", f"{option_price:.2f}")
 
-    # Combine the simulated price paths into a single DataFrame
-    df = pd.DataFrame(price_paths).T
-    # Rename columns
-    df.columns = [f"Path {i+1}" for i in range(num_simulations)]
+    # Percentile fan bands, filled between the outer and inner percentiles
+    with stage("page.monte_carlo.figure"):
+        fig = go.Figure()
+        for low, high, opacity in (("P5", "P95", 0.15), ("P25", "P75", 0.3)):
+            fig.add_trace(go.Scatter(x=bands.index, y=bands[low], line=dict(width=0), showlegend=False, hoverinfo="skip"))
+            fig.add_trace(go.Scatter(x=bands.index, y=bands[high], line=dict(width=0), fill="tonexty",
+                                     fillcolor=f"rgba(99, 110, 250, {opacity})", name=f"{low[1:]}-{high[1:]}th percentile"))
+
+        # Sampled paths drawn thin underneath the median
+        for path, data in sample.groupby("Path", sort=False):
+            fig.add_trace(go.Scatter(x=data["Time Steps"], y=data["Stock Price"], mode="lines", line=dict(width=0.7),
+                                     opacity=0.5, name=path, showlegend=False))
+        fig.add_trace(go.Scatter(x=bands.index, y=bands["P50"], mode="lines", line=dict(color="black", width=2), name="Median"))
+
+        fig.update_layout(title=f"Simulated Price Paths ({len(sample['Path'].unique())} of {num_simulations} shown)",
+                          xaxis_title="Time Steps", yaxis_title="Stock Price")
 
-    # Create an interactive plot using Plotly Express
-    fig = px.line(df, labels={"index": "Time Steps", "value": "Stock Price"}, title="Simulated Price Paths")
+    # Plotly serialisation happens in st.plotly_chart
+    with stage("page.monte_carlo.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+diagnostics_panel()
@@ -1,5 +1,6 @@
 import streamlit as st
-from bs_pricer import blackScholes,delta_calc,gamma_calc,vega_calc,theta_calc,rho_calc
+from app_cache import cached_bs_pricer
+from instrumentation import diagnostics_panel
 
 # set layout to wide
 st.set_page_config(layout="wide")
@@ -20,12 +21,7 @@ with col1:
 with col2:
     st.write("## Output")
     # Calculate the option price using Monte Carlo simulation and obtain price paths
-    bs_p = blackScholes(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type)
-    bs_d = delta_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type)
-    bs_g = gamma_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type)
-    bs_v = vega_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type)
-    bs_t = theta_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type)
-    bs_r = rho_calc(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type)
+    bs_p, bs_d, bs_g, bs_v, bs_t, bs_r = cached_bs_pricer(risk_free_rate, stock_price, strike_price, time_to_maturity, volatility, option_type)
 
     st.metric("The estimated option price is: ", f"{bs_p:.3f}")
     st.metric("The estimated option delta is: ", f"{bs_d:.3f}")
@@ -34,3 +30,4 @@ with col2:
     st.metric("The estimated option theta is: ", f"{bs_t:.3f}")
     st.metric("The estimated option rho is: ", f"{bs_r:.3f}")
 
+diagnostics_panel()
@@ -1,5 +1,6 @@
 import streamlit as st
-from var_cvar import Param_Var_CVaR
+from app_cache import cached_param_var
+from instrumentation import diagnostics_panel
 from datetime import datetime, timedelta
 import pandas as pd
 
@@ -31,7 +32,7 @@ confidence = st.slider('Confidence Level (1-X)%', min_value=1, max_value=99, val
 
 if ticker and start and end and confidence and returns:
     try:
-        VaR_norm, VaR_t, CVaR_norm, CVaR_t, StockVolatilityDay, StockVolatilityYear, nu = Param_Var_CVaR(ticker, start, end, confidence, returns)
+        VaR_norm, VaR_t, CVaR_norm, CVaR_t, StockVolatilityDay, StockVolatilityYear, nu = cached_param_var(ticker, start, end, confidence, returns)
         format_string = f"{{:.{st.session_state.decimal_places}f}}%"
 
         results = pd.DataFrame({
@@ -45,12 +46,10 @@ if ticker and start and end and confidence and returns:
     except Exception as e:
         st.error(f"An error occurred: {e}")
 
-# Slider for number of decimal places
-decimal_places = st.slider('Number of Decimal Places', min_value=0, max_value=10, value=2, step=1)
+# Slider for number of decimal places, the table above only reformats the cached results
+st.slider('Number of Decimal Places', min_value=0, max_value=10, step=1, key='decimal_places')
 
-if decimal_places != st.session_state.decimal_places:
-    st.session_state.decimal_places = decimal_places
-    st.experimental_rerun()
+diagnostics_panel()
 
 # Explanations
 st.markdown("## VaR and CVaR Calculation Formulas")
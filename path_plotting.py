@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+from instrumentation import timed
+
+FAN_PERCENTILES = (5, 25, 50, 75, 95)
+
+def lttb(y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of an evenly spaced series.
+
+    Parameters
+    ----------
+    y : array_like
+        Series values, x is taken as the position in the series.
+    threshold : int
+        Number of points to keep (at least 3).
+
+    Returns
+    -------
+    indices : numpy.ndarray
+        Sorted positions of the kept points, always including the first and last one.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = np.empty(threshold, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third corner of the triangle
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = (edges[i + 1] + next_end - 1) / 2 if i + 2 < len(edges) else n - 1
+        next_y = y[edges[i + 1]:next_end].mean() if i + 2 < len(edges) else y[-1]
+
+        x = np.arange(start, end)
+        areas = np.abs((previous - next_x) * (y[start:end] - y[previous]) - (previous - x) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        indices[i + 1] = previous
+    return indices
+
+def minmax_decimate(y, threshold):
+    """
+    Min/max decimation: keeps the lowest and highest point of each of threshold // 2 equal buckets.
+
+    Parameters
+    ----------
+    y : array_like
+        Series values.
+    threshold : int
+        Maximum number of points to keep.
+
+    Returns
+    -------
+    indices : numpy.ndarray
+        Sorted positions of the kept points, always including the first and last one.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+
+    buckets = np.array_split(np.arange(n), threshold // 2 - 1)
+    kept = [0, n - 1]
+    for bucket in buckets:
+        values = y[bucket]
+        kept.extend((bucket[np.argmin(values)], bucket[np.argmax(values)]))
+    return np.unique(kept)
+
+def _decimate(y, max_points, method):
+    if method == "lttb":
+        return lttb(y, max_points)
+    elif method == "minmax":
+        return minmax_decimate(y, max_points)
+    raise ValueError(f"Unknown decimation method '{method}', expected 'lttb' or 'minmax'")
+
+@timed("path_plotting.fan_chart_data")
+def fan_chart_data(price_paths, max_paths=50, max_points=500, method="lttb", percentiles=FAN_PERCENTILES, seed=0):
+    """
+    Reduces simulated price paths to a bounded amount of chart data.
+
+    Parameters
+    ----------
+    price_paths : array_like
+        (num_simulations x time steps) matrix of simulated prices.
+    max_paths : int, optional
+        Number of randomly sampled paths to draw individually.
+    max_points : int, optional
+        Maximum number of time steps kept per line.
+    method : str, optional
+        Time step downsampling, "lttb" (Largest-Triangle-Three-Buckets) or "minmax".
+    percentiles : tuple of float, optional
+        Percentiles of the price distribution at every time step.
+    seed : int, optional
+        Seed of the path sample, so reruns show the same paths.
+
+    Returns
+    -------
+    bands : pandas.DataFrame
+        Percentile bands indexed by time step, one column per percentile (e.g. "P5").
+    sample : pandas.DataFrame
+        Long format sampled paths with "Time Steps", "Stock Price" and "Path" columns.
+
+    Notes
+    -----
+    Percentiles are computed over every simulated path on the server, so the chart data holds at most
+    max_points * (len(percentiles) + max_paths) values whatever the number of simulations.
+    The bands share the time steps chosen on the median band so they can be filled between each other.
+    """
+    price_paths = np.asarray(price_paths, dtype=float)
+    num_paths, num_steps = price_paths.shape
+
+    levels = np.percentile(price_paths, percentiles, axis=0)
+    band_steps = _decimate(levels[len(percentiles) // 2], max_points, method)
+    bands = pd.DataFrame(levels[:, band_steps].T, index=pd.Index(band_steps + 1, name="Time Steps"),
+                         columns=[f"P{p:g}" for p in percentiles])
+
+    rng = np.random.default_rng(seed)
+    chosen = np.sort(rng.choice(num_paths, size=min(max_paths, num_paths), replace=False))
+    frames = []
+    for path in chosen:
+        steps = _decimate(price_paths[path], max_points, method)
+        frames.append(pd.DataFrame({"Time Steps": steps + 1, "Stock Price": price_paths[path, steps], "Path": f"Path {path + 1}"}))
+    sample = pd.concat(frames, ignore_index=True)
+
+    return bands, sample
@@ -0,0 +1,71 @@
+from functools import partial
+
+import numpy as np
+
+# Payoffs are evaluated on a (paths x 1 + monitoring dates) matrix of prices, the first column being the spot at
+# valuation and the last one maturity.
+# The factories return functools.partial objects so payoffs can be sent to worker processes.
+
+BARRIER_TYPES = ("up-and-out", "up-and-in", "down-and-out", "down-and-in")
+
+def _vanilla(option_type, prices, strike_price):
+    if option_type == "Call":
+        return np.maximum(prices - strike_price, 0)
+    elif option_type == "Put":
+        return np.maximum(strike_price - prices, 0)
+    raise ValueError(f"Unknown option type '{option_type}', expected 'Call' or 'Put'")
+
+def _european_payoff(price_paths, option_type, strike_price):
+    return _vanilla(option_type, price_paths[:, -1], strike_price)
+
+def _asian_payoff(price_paths, option_type, strike_price, average):
+    # The average runs over the monitoring dates only, not the spot
+    if average == "arithmetic":
+        mean_price = price_paths[:, 1:].mean(axis=1)
+    elif average == "geometric":
+        mean_price = np.exp(np.log(price_paths[:, 1:]).mean(axis=1))
+    else:
+        raise ValueError(f"Unknown average '{average}', expected 'arithmetic' or 'geometric'")
+    return _vanilla(option_type, mean_price, strike_price)
+
+def _barrier_payoff(price_paths, option_type, strike_price, barrier, barrier_type, rebate):
+    if barrier_type not in BARRIER_TYPES:
+        raise ValueError(f"Unknown barrier type '{barrier_type}', expected one of {BARRIER_TYPES}")
+    if barrier_type.startswith("up"):
+        hit = price_paths.max(axis=1) >= barrier
+    else:
+        hit = price_paths.min(axis=1) <= barrier
+    alive = ~hit if barrier_type.endswith("out") else hit
+    return np.where(alive, _vanilla(option_type, price_paths[:, -1], strike_price), rebate)
+
+def _lookback_payoff(price_paths, option_type, strike_price):
+    terminal = price_paths[:, -1]
+    if strike_price is None:
+        # Floating strike: buy at the lowest or sell at the highest price seen
+        if option_type == "Call":
+            return terminal - price_paths.min(axis=1)
+        elif option_type == "Put":
+            return price_paths.max(axis=1) - terminal
+    elif option_type == "Call":
+        return np.maximum(price_paths.max(axis=1) - strike_price, 0)
+    elif option_type == "Put":
+        return np.maximum(strike_price - price_paths.min(axis=1), 0)
+    raise ValueError(f"Unknown option type '{option_type}', expected 'Call' or 'Put'")
+
+def european(option_type, strike_price):
+    """ European call/put on the price at maturity """
+    return partial(_european_payoff, option_type=option_type, strike_price=strike_price)
+
+def asian(option_type, strike_price, average="arithmetic"):
+    """ Call/put on the arithmetic or geometric average price over the monitoring dates """
+    return partial(_asian_payoff, option_type=option_type, strike_price=strike_price, average=average)
+
+def barrier(option_type, strike_price, barrier, barrier_type, rebate=0.0):
+    """ Knock-in/knock-out call/put, barrier_type one of "up-and-out", "up-and-in", "down-and-out" and "down-and-in".
+    The barrier is monitored on the simulated dates and the rebate is paid at maturity when the option is not alive. """
+    return partial(_barrier_payoff, option_type=option_type, strike_price=strike_price, barrier=barrier,
+                   barrier_type=barrier_type, rebate=rebate)
+
+def lookback(option_type, strike_price=None):
+    """ Lookback call/put, floating strike when strike_price is None and fixed strike otherwise """
+    return partial(_lookback_payoff, option_type=option_type, strike_price=strike_price)
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from market_data import get_close_prices
+
+def portfolio_risk(StockReturns, Weights, confidence):
+    """
+    Calculates historical and parametric (normal) portfolio VaR and CVaR with their marginal and component contributions.
+
+    Parameters
+    ----------
+    StockReturns : pandas.DataFrame
+        Aligned daily returns with one column per ticker.
+    Weights : array_like
+        Portfolio weights (or position values) in the column order of StockReturns.
+    confidence : float
+        The confidence level expressed as a decimal (e.g., 0.95 for 95% confidence).
+
+    Returns
+    -------
+    summary : pandas.Series
+        Portfolio historical and parametric VaR and CVaR (as positive losses) and the daily and annualised volatility.
+    contributions : pandas.DataFrame
+        Per ticker weight, marginal VaR/CVaR and component VaR/CVaR. Component values add up to the portfolio figures.
+
+    Notes
+    -----
+    The covariance matrix is computed once and every contribution is a matrix product. Parametric contributions are
+    the Euler allocation w_i * dVaR/dw_i. Historical CVaR contributions are the weighted average asset returns over
+    the tail scenarios and historical VaR contributions use the scenario at the VaR quantile, rescaled to add up.
+    """
+    R = np.asarray(StockReturns, dtype=float)
+    w = np.asarray(Weights, dtype=float)
+    tickers = list(StockReturns.columns) if isinstance(StockReturns, pd.DataFrame) else list(range(R.shape[1]))
+
+    # Covariance engine
+    mu = R.mean(axis=0)
+    cov = np.cov(R, rowvar=False).reshape(len(w), len(w))
+    cov_w = cov @ w
+    sigma_p = np.sqrt(w @ cov_w)
+    mu_p = w @ mu
+
+    # Parametric VaR and CVaR with normal returns and their marginals
+    from scipy.stats import norm
+    z = norm.ppf(confidence)
+    cvar_factor = norm.pdf(z) / (1 - confidence)
+    VaR_norm = z * sigma_p - mu_p
+    CVaR_norm = cvar_factor * sigma_p - mu_p
+    marginal_VaR = z * cov_w / sigma_p - mu
+    marginal_CVaR = cvar_factor * cov_w / sigma_p - mu
+
+    # Historical VaR and CVaR from the portfolio return scenarios
+    portfolio_returns = R @ w
+    histVar = -np.percentile(portfolio_returns, (1 - confidence) * 100)
+    tail = portfolio_returns <= -histVar
+    histCVar = -portfolio_returns[tail].mean()
+    hist_component_CVaR = -w * R[tail].mean(axis=0)
+
+    # Scenario at the VaR quantile, rescaled so the components add up to the interpolated quantile
+    quantile_scenario = R[np.argsort(portfolio_returns)[tail.sum() - 1]]
+    hist_component_VaR = -w * quantile_scenario
+    if hist_component_VaR.sum() != 0:
+        hist_component_VaR *= histVar / hist_component_VaR.sum()
+
+    summary = pd.Series({
+        "Historical VaR": histVar,
+        "Historical CVaR": histCVar,
+        "Parametric VaR (Normal)": VaR_norm,
+        "Parametric CVaR (Normal)": CVaR_norm,
+        "Portfolio Volatility (Day)": sigma_p,
+        "Portfolio Volatility (Year)": sigma_p * np.sqrt(252),
+    }, dtype=float)
+
+    contributions = pd.DataFrame({
+        "Weight": w,
+        "Marginal VaR": marginal_VaR,
+        "Component VaR": w * marginal_VaR,
+        "Marginal CVaR": marginal_CVaR,
+        "Component CVaR": w * marginal_CVaR,
+        "Historical Component VaR": hist_component_VaR,
+        "Historical Component CVaR": hist_component_CVaR,
+    }, index=pd.Index(tickers, name="Ticker"))
+
+    return summary, contributions
+
+def Portfolio_VaR_CVaR(Tickers, Weights, Start, End, confidence, returns, fetcher=None):
+    """
+    Gets price data for a portfolio in one batched request and calculates its VaR and CVaR.
+
+    Parameters
+    ----------
+    Tickers : list of str
+        The ticker symbols of the portfolio (e.g., ['AAPL', 'GOOG']).
+    Weights : array_like
+        The weight (or position value) of each ticker, in the same order as Tickers.
+    Start : str
+        The start date for fetching data in 'YYYY-MM-DD' format.
+    End : str
+        The end date for fetching data in 'YYYY-MM-DD' format.
+    confidence : float
+        The confidence level expressed as a decimal (e.g., 0.95 for 95% confidence).
+    returns : str
+        The type of returns to calculate, "simple" or "continuously compounded".
+    fetcher : callable, optional
+        Price source passed to market_data.get_close_prices, defaults to Yahoo Finance.
+
+    Returns
+    -------
+    summary : pandas.Series
+        Portfolio historical and parametric VaR and CVaR (as positive losses) and volatilities.
+    contributions : pandas.DataFrame
+        Marginal and component contributions per ticker, see portfolio_risk.
+
+    Notes
+    -----
+    Only dates where every ticker has a price are kept. With continuously compounded returns the portfolio
+    return is approximated by the weighted sum of the log returns.
+
+    Examples
+    --------
+    >>> Portfolio_VaR_CVaR(["AAPL", "GOOG"], [0.5, 0.5], "2020-01-01", "2021-01-01", 0.95, returns="simple")
+    """
+    # Ensure Start and End are in datetime format
+    if returns == "simple":
+        Start = pd.to_datetime(Start)
+        End = pd.to_datetime(End)
+    elif returns == "continuously compounded":
+        Start = pd.to_datetime(Start) - pd.Timedelta(days=1)
+        End = pd.to_datetime(End)
+
+    # Fetch all tickers at once and align them on common dates
+    Data = get_close_prices(list(Tickers), Start, End, fetcher=fetcher).dropna()
+
+    # Calculate daily returns
+    if returns == "simple":
+        StockReturns = Data.pct_change().dropna()
+    elif returns == "continuously compounded":
+        StockReturns = np.log(Data / Data.shift(1)).dropna()
+
+    return portfolio_risk(StockReturns, Weights, confidence)
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from bs_pricer import GREEKS, bs_values
+
+DEFAULT_SPOT_SHOCKS = np.round(np.arange(-0.30, 0.3001, 0.01), 2)  # Relative spot moves, -30% to +30% in 1% steps
+DEFAULT_VOL_SHOCKS = (-0.05, 0.0, 0.05)  # Absolute volatility shifts
+DEFAULT_DAYS = (0, 1, 7, 30)  # Calendar days of time decay
+DEFAULT_RATE_SHIFTS = (0.0,)  # Absolute rate shifts
+MAX_CHUNK_ELEMENTS = 2_000_000  # Positions x scenarios evaluated at once
+MIN_VOLATILITY = 1e-4
+
+POSITION_COLUMNS = ("option_type", "stock_price", "strike_price", "time_to_maturity", "volatility", "risk_free_rate", "quantity")
+SCENARIO_COLUMNS = ["Spot Shock", "Vol Shock", "Days", "Rate Shift"]
+
+def _scenario_values(positions, spot_shocks, vol_shocks, days, rate_shifts):
+    """ Returns price and greeks with shape (positions, spot, vol, days, rate) for a chunk of positions """
+    column = lambda name: positions[name].to_numpy(dtype=float)[:, None, None, None, None]
+    is_call = positions["option_type"].str.lower().str.startswith("c").to_numpy()[:, None, None, None, None]
+
+    spot = column("stock_price") * (1 + spot_shocks[None, :, None, None, None])
+    vol = np.maximum(column("volatility") + vol_shocks[None, None, :, None, None], MIN_VOLATILITY)
+    ttm = column("time_to_maturity") - days[None, None, None, :, None] / 365
+    rate = column("risk_free_rate") + rate_shifts[None, None, None, None, :]
+    strike = column("strike_price")
+    spot, vol, ttm, rate, strike, is_call = np.broadcast_arrays(spot, vol, ttm, rate, strike, is_call)
+
+    # Options that expire inside the scenario are worth their intrinsic value
+    expired = ttm <= 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = bs_values(rate, spot, strike, np.where(expired, 1.0, ttm), vol, is_call)
+    if expired.any():
+        intrinsic = np.where(is_call, np.maximum(spot - strike, 0), np.maximum(strike - spot, 0))
+        values["price"] = np.where(expired, intrinsic, values["price"])
+        values["delta"] = np.where(expired, np.where(is_call, 1.0, -1.0) * (intrinsic > 0), values["delta"])
+        for greek in ("gamma", "vega", "theta", "rho"):
+            values[greek] = np.where(expired, 0.0, values[greek])
+    return values
+
+def scenario_ladder(positions, spot_shocks=DEFAULT_SPOT_SHOCKS, vol_shocks=DEFAULT_VOL_SHOCKS, days=DEFAULT_DAYS,
+                    rate_shifts=DEFAULT_RATE_SHIFTS, by_position=False, max_chunk_elements=MAX_CHUNK_ELEMENTS):
+    """
+    Revalues a portfolio of options on a spot x volatility x time x rate shock grid.
+
+    Parameters
+    ----------
+    positions : pandas.DataFrame
+        One row per position with columns option_type ("Call"/"Put"), stock_price, strike_price,
+        time_to_maturity (years), volatility, risk_free_rate and quantity. The index identifies positions.
+    spot_shocks : array_like, optional
+        Relative spot moves (e.g. -0.05 for -5%).
+    vol_shocks : array_like, optional
+        Absolute volatility shifts (e.g. 0.05 for +5 vol points).
+    days : array_like, optional
+        Calendar days of time decay.
+    rate_shifts : array_like, optional
+        Absolute rate shifts.
+    by_position : bool, optional
+        Also return the ladder of every position, not only the portfolio.
+    max_chunk_elements : int, optional
+        Maximum number of position x scenario values evaluated at once, bounds memory.
+
+    Returns
+    -------
+    ladder : pandas.DataFrame
+        One row per scenario with the shocks, the portfolio value, the P&L against the unshocked value and the
+        greeks, all multiplied by the quantities. Greeks follow bs_pricer units: vega and rho per 1%, theta per day.
+    position_ladder : pandas.DataFrame
+        Only when by_position is True, in which case (ladder, position_ladder) is returned: the same columns
+        with one row per position and scenario, the position index in a leading "Position" column.
+
+    Notes
+    -----
+    Each chunk of positions is priced on the whole grid as one broadcast array computation with d1/d2 computed
+    once per position and scenario, and portfolio totals are accumulated chunk by chunk.
+
+    Examples
+    --------
+    >>> positions = pd.DataFrame({"option_type": ["Call", "Put"], "stock_price": 100, "strike_price": [105, 95],
+    ...                           "time_to_maturity": 0.5, "volatility": 0.2, "risk_free_rate": 0.03, "quantity": [10, -5]})
+    >>> scenario_ladder(positions)
+    """
+    missing = set(POSITION_COLUMNS) - set(positions.columns)
+    if missing:
+        raise ValueError(f"positions is missing the columns {sorted(missing)}")
+
+    shocks = [np.asarray(x, dtype=float).ravel() for x in (spot_shocks, vol_shocks, days, rate_shifts)]
+    grid_shape = tuple(len(x) for x in shocks)
+    grid_size = int(np.prod(grid_shape))
+    chunk = max(max_chunk_elements // grid_size, 1)
+
+    # Unshocked values for the P&L
+    base = bs_values(positions["risk_free_rate"], positions["stock_price"], positions["strike_price"],
+                     positions["time_to_maturity"], positions["volatility"], positions["option_type"].to_numpy())["price"]
+
+    totals = {name: np.zeros(grid_size) for name in ("Value", "P&L") + tuple(g.capitalize() for g in GREEKS[1:])}
+    position_frames = []
+    for start in range(0, len(positions), chunk):
+        block = positions.iloc[start:start + chunk]
+        quantity = block["quantity"].to_numpy(dtype=float)[:, None]
+        values = {name: v.reshape(len(block), grid_size) for name, v in _scenario_values(block, *shocks).items()}
+
+        weighted = {"Value": quantity * values["price"], "P&L": quantity * (values["price"] - base[start:start + chunk, None])}
+        weighted.update({greek.capitalize(): quantity * values[greek] for greek in GREEKS[1:]})
+        for name, value in weighted.items():
+            totals[name] += value.sum(axis=0)
+        if by_position:
+            frame = pd.DataFrame({name: value.ravel() for name, value in weighted.items()})
+            frame.insert(0, "Position", np.repeat(block.index.to_numpy(), grid_size))
+            position_frames.append(frame)
+
+    grid = pd.MultiIndex.from_product(shocks, names=SCENARIO_COLUMNS).to_frame(index=False)
+    ladder = pd.concat([grid, pd.DataFrame(totals)], axis=1)
+    if not by_position:
+        return ladder
+
+    position_ladder = pd.concat(position_frames, ignore_index=True)
+    scenario = grid.iloc[np.tile(np.arange(grid_size), len(positions))].reset_index(drop=True)
+    position_ladder = pd.concat([position_ladder[["Position"]], scenario, position_ladder.drop(columns="Position")], axis=1)
+    return ladder, position_ladder
+
+def export_ladder(ladder, path):
+    """ Writes a ladder to Parquet (.parquet) or CSV (any other extension) """
+    if str(path).endswith(".parquet"):
+        ladder.to_parquet(path, index=False)
+    else:
+        ladder.to_csv(path, index=False)
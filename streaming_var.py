@@ -0,0 +1,227 @@
+import asyncio
+import math
+
+import pandas as pd
+from scipy.special import ndtri
+
+# Streaming VaR and CVaR: an asyncio consumer reads prices from a pluggable source and updates running return
+# statistics in O(1) per tick, without keeping the return history. VaR and CVaR are positive losses.
+
+TAIL_POINTS = 8  # Quantiles averaged for the streaming historical CVaR
+WARMUP = 20  # Returns seen before estimates are emitted
+
+class P2Quantile:
+    """
+    Streaming quantile estimate with the P-square algorithm (Jain and Chlamtac, 1985).
+
+    Five markers track the minimum, the p/2, p and (1+p)/2 quantiles and the maximum, and are moved with a
+    piecewise-parabolic interpolation on every observation, so memory and update time are constant.
+    """
+
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError(f"Quantile level must be in (0, 1), got {p}")
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2*p, 4*p, 2 + 2*p, 4]
+        self.increments = [0, p/2, p, (1 + p)/2, 1]
+
+    def update(self, x):
+        self.count += 1
+        q, n = self.heights, self.positions
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        # Cell of the new observation, stretching the extreme markers if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired = self.desired
+        for i in range(5):
+            desired[i] += self.increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d/(n[i + 1] - n[i - 1])*((n[i] - n[i - 1] + d)*(q[i + 1] - q[i])/(n[i + 1] - n[i])
+                                                           + (n[i + 1] - n[i] - d)*(q[i] - q[i - 1])/(n[i] - n[i - 1]))
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] += d*(q[i + d] - q[i])/(n[i + d] - n[i])
+                n[i] += d
+
+    def value(self):
+        if self.count == 0:
+            return math.nan
+        if self.count <= 5:
+            # Exact (linearly interpolated) quantile of the few observations seen
+            position = self.p*(self.count - 1)
+            low = int(position)
+            high = min(low + 1, self.count - 1)
+            return self.heights[low] + (position - low)*(self.heights[high] - self.heights[low])
+        return self.heights[2]
+
+class StreamingVaR:
+    """
+    Running historical and normal parametric VaR and CVaR of a price stream.
+
+    Parameters
+    ----------
+    confidence : float, optional
+        The confidence level expressed as a decimal (e.g., 0.99 for 99%).
+    returns : str, optional
+        "simple" or "continuously compounded" returns between consecutive prices.
+    tail_points : int, optional
+        Number of streaming quantiles averaged for the historical CVaR.
+    warmup : int, optional
+        Number of returns seen before update() starts returning estimates.
+
+    Notes
+    -----
+    The mean and variance are updated with Welford's algorithm. The historical VaR is a P-square estimate of
+    the (1 - confidence) return quantile, and the historical CVaR approximates the tail mean
+    (1 / a) * integral of the quantile function over (0, a), with a = 1 - confidence, by the average of
+    tail_points P-square quantiles at the midpoints a * (i - 0.5) / tail_points. Every tick therefore costs a
+    fixed tail_points + 1 quantile updates, whatever the length of the stream.
+    """
+
+    def __init__(self, confidence=0.95, returns="simple", tail_points=TAIL_POINTS, warmup=WARMUP):
+        if returns not in ("simple", "continuously compounded"):
+            raise ValueError(f"Unknown return type '{returns}', expected 'simple' or 'continuously compounded'")
+        self.confidence = confidence
+        self.returns = returns
+        self.warmup = warmup
+        self.last_price = None
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+        alpha = 1 - confidence
+        self.var_quantile = P2Quantile(alpha)
+        self.tail_quantiles = [P2Quantile(alpha*(i + 0.5)/tail_points) for i in range(tail_points)]
+        # Normal quantile and tail factor are fixed, so the parametric estimates are O(1) arithmetic
+        z = float(ndtri(confidence))
+        self.z = z
+        self.cvar_factor = math.exp(-z**2/2)/math.sqrt(2*math.pi)/alpha
+
+    def update(self, price):
+        """Adds a price, returns the current estimates (see estimates()) or None during the warm-up."""
+        last, self.last_price = self.last_price, price
+        if last is None:
+            return None
+        r = price/last - 1 if self.returns == "simple" else math.log(price/last)
+
+        # Welford's running mean and variance
+        self.count += 1
+        delta = r - self.mean
+        self.mean += delta/self.count
+        self.m2 += delta*(r - self.mean)
+
+        self.var_quantile.update(r)
+        for quantile in self.tail_quantiles:
+            quantile.update(r)
+        return self.estimates() if self.count >= self.warmup else None
+
+    def estimates(self):
+        """
+        Returns
+        -------
+        estimates : dict
+            Number of returns, running mean and daily volatility of the returns, historical VaR and CVaR and
+            normal parametric VaR and CVaR, all as positive losses.
+        """
+        std = math.sqrt(self.m2/(self.count - 1)) if self.count > 1 else math.nan
+        tail_mean = sum(quantile.value() for quantile in self.tail_quantiles)/len(self.tail_quantiles)
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "volatility": std,
+            "VaR_hist": -self.var_quantile.value(),
+            "CVaR_hist": -tail_mean,
+            "VaR_norm": self.z*std - self.mean,
+            "CVaR_norm": self.cvar_factor*std - self.mean,
+        }
+
+async def replay_source(path, ticker=None, speed=None):
+    """
+    Replays prices from a local CSV or Parquet file as (timestamp, price) ticks.
+
+    Parameters
+    ----------
+    path : str
+        File with a date/time index and either a "Close" column or one column per ticker.
+    ticker : str, optional
+        Column to replay, defaults to "Close" or the only column of the file.
+    speed : float, optional
+        Replay speed relative to the timestamps (e.g. 60 replays a minute per second). By default ticks are
+        replayed as fast as possible, yielding to the event loop between ticks.
+    """
+    frame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path, index_col=0, parse_dates=True)
+    frame.index = pd.to_datetime(frame.index)
+    column = ticker or ("Close" if "Close" in frame.columns else frame.columns[0])
+    prices = frame[column].dropna()
+
+    previous = None
+    for timestamp, price in zip(prices.index, prices.to_numpy()):
+        delay = 0 if speed is None or previous is None else (timestamp - previous).total_seconds()/speed
+        previous = timestamp
+        await asyncio.sleep(delay)
+        yield timestamp, float(price)
+
+async def queue_source(queue):
+    """Yields (timestamp, price) ticks put on an asyncio.Queue by a feed handler, until None is put."""
+    while True:
+        tick = await queue.get()
+        if tick is None:
+            return
+        yield tick
+
+async def stream_var(source, confidence=0.95, returns="simple", tail_points=TAIL_POINTS, warmup=WARMUP):
+    """
+    Consumes a tick source and yields updated VaR and CVaR on every tick after the warm-up.
+
+    Parameters
+    ----------
+    source : async iterable
+        (timestamp, price) ticks, e.g. replay_source or queue_source.
+    confidence, returns, tail_points, warmup
+        See StreamingVaR.
+
+    Yields
+    ------
+    timestamp, estimates : tuple
+        The tick timestamp and StreamingVaR.estimates().
+
+    Examples
+    --------
+    >>> async def monitor():
+    ...     async for timestamp, risk in stream_var(replay_source("prices.parquet", "AAPL"), confidence=0.99):
+    ...         print(timestamp, risk["VaR_hist"], risk["CVaR_hist"])
+    >>> asyncio.run(monitor())
+    """
+    estimator = StreamingVaR(confidence, returns, tail_points, warmup)
+    async for timestamp, price in source:
+        estimates = estimator.update(price)
+        if estimates is not None:
+            yield timestamp, estimates
+
+async def consume(source, on_update, **kwargs):
+    """Runs stream_var until the source ends, calling on_update(timestamp, estimates) on every update."""
+    async for timestamp, estimates in stream_var(source, **kwargs):
+        on_update(timestamp, estimates)
@@ -0,0 +1,130 @@
+import numpy as np
+from scipy.special import digamma, gammaln, zeta
+
+NU_BOUNDS = (0.5, 1e6)  # Search range for the degrees of freedom
+
+def _t_loglik(x, nu, loc, scale):
+    """Average log likelihood of the location-scale t-distribution for every column of x."""
+    z2 = ((x - loc) / scale)**2
+    return (gammaln((nu + 1) / 2) - gammaln(nu / 2) - 0.5 * np.log(nu * np.pi) - np.log(scale)
+            - (nu + 1) / 2 * np.log1p(z2 / nu).mean(axis=0))
+
+def _update_nu(d, nu, newton_steps=2):
+    """Maximises the t log likelihood in nu for fixed squared standardised residuals d, one nu per column."""
+    lower, upper = np.full_like(nu, NU_BOUNDS[0]), np.full_like(nu, NU_BOUNDS[1])
+    for _ in range(newton_steps):
+        ratio = d / (nu * (nu + d))
+        m1 = np.log1p(d / nu).mean(axis=0)
+        m2 = ratio.mean(axis=0)
+        dm2 = (-d * (2 * nu + d) / (nu * (nu + d))**2).mean(axis=0)
+        grad = 0.5 * digamma((nu + 1) / 2) - 0.5 * digamma(nu / 2) - 1 / (2 * nu) - 0.5 * m1 + 0.5 * (nu + 1) * m2
+        hess = 0.25 * zeta(2, (nu + 1) / 2) - 0.25 * zeta(2, nu / 2) + 1 / (2 * nu**2) + m2 + 0.5 * (nu + 1) * dm2
+
+        # Keep a bracket on the root of the gradient and fall back to its geometric midpoint
+        lower = np.where(grad > 0, nu, lower)
+        upper = np.where(grad < 0, nu, upper)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            proposal = nu - grad / hess
+        outside = ~np.isfinite(proposal) | (hess >= 0) | (proposal <= lower) | (proposal >= upper)
+        nu = np.where(outside, np.sqrt(lower * upper), proposal)
+    return nu
+
+def _starting_values(x):
+    """Kurtosis based starting point: excess kurtosis of a t-distribution is 6 / (nu - 4)."""
+    loc = np.median(x, axis=0)
+    centred = x - x.mean(axis=0)
+    variance = (centred**2).mean(axis=0)
+    excess_kurtosis = (centred**4).mean(axis=0) / variance**2 - 3
+    with np.errstate(divide="ignore"):
+        nu = np.where(excess_kurtosis > 0, 4 + 6 / excess_kurtosis, 30.0)
+    nu = np.clip(nu, 2.5, 100.0)
+    scale = np.sqrt(variance * (nu - 2) / nu)
+    return nu, loc, scale
+
+def fit_t(StockReturns, start=None, tol=1e-10, max_iter=500):
+    """
+    Fits a location-scale Student t-distribution by maximum likelihood.
+
+    Parameters
+    ----------
+    StockReturns : array_like
+        A 1-D return series, or a 2-D array with one return series per column to fit many series at once.
+    start : tuple of (nu, loc, scale), optional
+        Warm start, e.g. the previous fit of an overlapping window. Defaults to a kurtosis based guess.
+    tol : float, optional
+        Convergence tolerance on the change of the average log likelihood.
+    max_iter : int, optional
+        Maximum number of EM iterations.
+
+    Returns
+    -------
+    nu, loc, scale : float or numpy.ndarray
+        Fitted parameters in the order returned by scipy.stats.t.fit, arrays when a 2-D input is given.
+
+    Notes
+    -----
+    ECME algorithm: the E-step weights each return by (nu + 1) / (nu + z^2), the M-step updates the
+    location and scale in closed form (with the parameter expanded scale update, which converges faster) and nu
+    is then maximised directly with safeguarded Newton steps on the profile log likelihood. All series are
+    iterated together as columns of one array.
+    """
+    x = np.asarray(StockReturns, dtype=float)
+    single = x.ndim == 1
+    x = x.reshape(len(x), -1)
+
+    if start is None:
+        nu, loc, scale = _starting_values(x)
+    else:
+        nu, loc, scale = (np.broadcast_to(np.asarray(p, dtype=float), x.shape[1]).copy() for p in start)
+
+    loglik = _t_loglik(x, nu, loc, scale)
+    active = np.arange(x.shape[1])
+    for _ in range(max_iter):
+        xa = x[:, active]
+        na, la, sa = nu[active], loc[active], scale[active]
+
+        # E-step weights, then location and scale M-step
+        d = ((xa - la) / sa)**2
+        weights = (na + 1) / (na + d)
+        la = (weights * xa).sum(axis=0) / weights.sum(axis=0)
+        sa = np.sqrt((weights * (xa - la)**2).sum(axis=0) / weights.sum(axis=0))
+
+        # Degrees of freedom maximised on the observed likelihood
+        na = _update_nu(((xa - la) / sa)**2, na)
+
+        nu[active], loc[active], scale[active] = na, la, sa
+        new_loglik = _t_loglik(xa, na, la, sa)
+        converged = np.abs(new_loglik - loglik[active]) < tol
+        loglik[active] = new_loglik
+        active = active[~converged]
+        if len(active) == 0:
+            break
+
+    if single:
+        return float(nu[0]), float(loc[0]), float(scale[0])
+    return nu, loc, scale
+
+def compare_with_scipy(StockReturns):
+    """
+    Checks fit_t against scipy.stats.t.fit on a return series.
+
+    Parameters
+    ----------
+    StockReturns : array_like
+        A 1-D return series.
+
+    Returns
+    -------
+    comparison : dict
+        Both parameter sets, their average log likelihoods and the log likelihood gain of fit_t
+        (positive or ~0 when fit_t is at least as good as scipy).
+    """
+    from scipy.stats import t
+
+    x = np.asarray(StockReturns, dtype=float).ravel()
+    ours = fit_t(x)
+    theirs = t.fit(x)
+    loglik_ours = float(t.logpdf(x, *ours).mean())
+    loglik_theirs = float(t.logpdf(x, *theirs).mean())
+    return {"fit_t": ours, "scipy": tuple(float(p) for p in theirs),
+            "loglik_fit_t": loglik_ours, "loglik_scipy": loglik_theirs, "loglik_gain": loglik_ours - loglik_theirs}
@@ -0,0 +1,249 @@
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+import pandas as pd
+from scipy.special import chdtrc
+from market_data import get_close_prices
+from t_fit import fit_t as fit_student_t
+from var_cvar import param_var_cvar
+
+T_FIT_BLOCK = 64  # Number of consecutive windows fitted together
+
+def rolling_var(StockReturns, window, confidence, fit_t=True):
+    """
+    Calculates rolling historical and parametric VaR and CVaR, updating the window statistics incrementally.
+
+    Parameters
+    ----------
+    StockReturns : pandas.Series
+        Daily returns indexed by date.
+    window : int
+        Number of past returns used for each day's estimate (e.g., 250).
+    confidence : float
+        The confidence level expressed as a decimal (e.g., 0.95 for 95% confidence).
+    fit_t : bool, optional
+        Fit the t-distribution degrees of freedom every day. If False the t columns are NaN.
+
+    Returns
+    -------
+    results : pandas.DataFrame
+        One row per forecast day with the realised return and the Historical VaR/CVaR, VaR/CVaR (Normal),
+        VaR/CVaR (T), nu and daily volatility estimated from the previous `window` returns. Every VaR and CVaR is
+        reported as a positive loss so it can be compared directly with -Return.
+
+    Notes
+    -----
+    The mean and standard deviation come from running sums updated in O(1) per day (recomputed exactly once per
+    window to stop rounding drift). The empirical quantile is read from a sorted window maintained with binary
+    search inserts and removals, so no percentile is recomputed from scratch. The t-distribution is fitted with
+    t_fit.fit_t on blocks of consecutive windows, each block starting from the parameters of the previous block's
+    last day. Historical figures match HistVar_CVaR and parametric ones match Param_Var_CVaR on the same window.
+    """
+    values = np.asarray(StockReturns, dtype=float).ravel()
+    n = len(values)
+    if n <= window:
+        raise ValueError(f"Need more than {window} returns, got {n}")
+
+    num_days = n - window
+    hist_var, hist_cvar = np.empty(num_days), np.empty(num_days)
+    mus, stds, nus = np.empty(num_days), np.empty(num_days), np.full(num_days, np.nan)
+
+    # np.percentile linear interpolation position inside the sorted window
+    position = (window - 1) * (1 - confidence)
+    lower = int(np.floor(position))
+    fraction = position - lower
+
+    sorted_window = sorted(values[:window])
+    total, total_sq = values[:window].sum(), np.dot(values[:window], values[:window])
+
+    for day in range(num_days):
+        if day > 0:
+            old, new = values[day - 1], values[day + window - 1]
+            del sorted_window[bisect_left(sorted_window, old)]
+            insort(sorted_window, new)
+            if day % window == 0:
+                current = values[day:day + window]
+                total, total_sq = current.sum(), np.dot(current, current)
+            else:
+                total += new - old
+                total_sq += new * new - old * old
+
+        quantile = sorted_window[lower] + fraction * (sorted_window[min(lower + 1, window - 1)] - sorted_window[lower])
+        tail_count = bisect_right(sorted_window, quantile)
+        hist_var[day] = -quantile
+        hist_cvar[day] = -sum(sorted_window[:tail_count]) / tail_count
+
+        mus[day] = total / window
+        stds[day] = np.sqrt(max(total_sq - total * total / window, 0.0) / (window - 1))
+
+    # t fits run on blocks of consecutive windows at once, each block warm-started from the last fit of the previous one
+    if fit_t:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)[:num_days].T
+        fit_params = None
+        for block in range(0, num_days, T_FIT_BLOCK):
+            fit_params = fit_student_t(windows[:, block:block + T_FIT_BLOCK],
+                                       start=None if fit_params is None else tuple(p[-1] for p in fit_params))
+            nus[block:block + T_FIT_BLOCK] = np.round(fit_params[0])
+
+    VaR_norm, VaR_t, CVaR_norm, CVaR_t = param_var_cvar(mus, stds, nus, confidence)
+
+    index = StockReturns.index[window:] if isinstance(StockReturns, (pd.Series, pd.DataFrame)) else np.arange(window, n)
+    return pd.DataFrame({
+        "Return": values[window:],
+        "Historical VaR": hist_var,
+        "Historical CVaR": hist_cvar,
+        "VaR (Normal)": VaR_norm,
+        "CVaR (Normal)": CVaR_norm,
+        "VaR (T)": VaR_t,
+        "CVaR (T)": CVaR_t,
+        "nu": nus,
+        "Volatility (Day)": stds,
+    }, index=index)
+
+def kupiec_test(exceptions, confidence):
+    """
+    Kupiec proportion of failures test.
+
+    Parameters
+    ----------
+    exceptions : array_like of bool
+        True on days where the loss exceeded the VaR.
+    confidence : float
+        The VaR confidence level expressed as a decimal.
+
+    Returns
+    -------
+    LR_pof : float
+        Likelihood ratio statistic, chi-squared with 1 degree of freedom under correct coverage.
+    p_value : float
+        p-value of the test.
+    """
+    exceptions = np.asarray(exceptions, dtype=bool)
+    n, x = len(exceptions), exceptions.sum()
+    p = 1 - confidence
+    observed = x / n
+    log_null = (n - x) * np.log(1 - p) + x * np.log(p)
+    log_alt = (n - x) * np.log(1 - observed) if x < n else 0.0
+    log_alt += x * np.log(observed) if x > 0 else 0.0
+    LR_pof = -2 * (log_null - log_alt)
+    return float(LR_pof), float(chdtrc(1, LR_pof))
+
+def christoffersen_test(exceptions):
+    """
+    Christoffersen independence test on the sequence of VaR exceptions.
+
+    Parameters
+    ----------
+    exceptions : array_like of bool
+        True on days where the loss exceeded the VaR.
+
+    Returns
+    -------
+    LR_ind : float
+        Likelihood ratio statistic, chi-squared with 1 degree of freedom when exceptions are independent.
+    p_value : float
+        p-value of the test.
+    """
+    exceptions = np.asarray(exceptions, dtype=int)
+    previous, current = exceptions[:-1], exceptions[1:]
+    n00 = np.sum((previous == 0) & (current == 0))
+    n01 = np.sum((previous == 0) & (current == 1))
+    n10 = np.sum((previous == 1) & (current == 0))
+    n11 = np.sum((previous == 1) & (current == 1))
+
+    def log_likelihood(stay, move):
+        # Binomial log likelihood with the maximum likelihood probability, 0 * log(0) taken as 0
+        total = stay + move
+        if total == 0:
+            return 0.0
+        result = stay * np.log(stay / total) if stay > 0 else 0.0
+        return result + (move * np.log(move / total) if move > 0 else 0.0)
+
+    log_alt = log_likelihood(n00, n01) + log_likelihood(n11, n10)
+    log_null = log_likelihood(n00 + n10, n01 + n11)
+    LR_ind = -2 * (log_null - log_alt)
+    return float(LR_ind), float(chdtrc(1, LR_ind))
+
+def backtest_var(results, confidence, columns=("Historical VaR", "VaR (Normal)", "VaR (T)")):
+    """
+    Runs the Kupiec and Christoffersen backtests on the output of rolling_var.
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Output of rolling_var.
+    confidence : float
+        The VaR confidence level expressed as a decimal.
+    columns : tuple of str, optional
+        VaR columns to backtest.
+
+    Returns
+    -------
+    report : pandas.DataFrame
+        One row per VaR model with the number and rate of exceptions, the Kupiec, Christoffersen and
+        conditional coverage statistics and their p-values.
+    """
+    rows = {}
+    for column in columns:
+        valid = results[column].notna()
+        exceptions = (-results["Return"][valid] > results[column][valid]).to_numpy()
+        LR_pof, p_pof = kupiec_test(exceptions, confidence)
+        LR_ind, p_ind = christoffersen_test(exceptions)
+        rows[column] = {
+            "Days": len(exceptions),
+            "Exceptions": int(exceptions.sum()),
+            "Exception Rate": exceptions.mean(),
+            "Expected Rate": 1 - confidence,
+            "Kupiec LR": LR_pof,
+            "Kupiec p-value": p_pof,
+            "Christoffersen LR": LR_ind,
+            "Christoffersen p-value": p_ind,
+            "Conditional Coverage LR": LR_pof + LR_ind,
+            "Conditional Coverage p-value": float(chdtrc(2, LR_pof + LR_ind)),
+        }
+    return pd.DataFrame(rows).T
+
+def Rolling_VaR_CVaR(Ticker, Start, End, window, confidence, returns, fetcher=None, fit_t=True):
+    """
+    Gets stock price data once and calculates rolling VaR and CVaR with their backtests.
+
+    Parameters
+    ----------
+    Ticker : str
+        The ticker symbol of the stock to analyze (e.g., 'GOOG' for Google).
+    Start : str
+        The start date for the data in 'YYYY-MM-DD' format.
+    End : str
+        The end date for the data in 'YYYY-MM-DD' format.
+    window : int
+        Number of past returns used for each day's estimate.
+    confidence : float
+        The confidence level expressed as a decimal (e.g., 0.95 for 95% confidence).
+    returns : str
+        The type of returns to calculate, "simple" or "continuously compounded".
+    fetcher : callable, optional
+        Price source passed to market_data.get_close_prices, defaults to Yahoo Finance.
+    fit_t : bool, optional
+        Fit the t-distribution every day, see rolling_var.
+
+    Returns
+    -------
+    results : pandas.DataFrame
+        Daily VaR and CVaR estimates, see rolling_var.
+    report : pandas.DataFrame
+        Exception backtests, see backtest_var.
+
+    Examples
+    --------
+    >>> Rolling_VaR_CVaR("GOOG", "2014-01-01", "2024-01-01", 250, 0.99, returns="simple")
+    """
+    Data = get_close_prices(Ticker, Start, End, fetcher=fetcher)
+
+    # Calculate daily returns
+    if returns == "simple":
+        StockReturns = Data.pct_change().dropna()
+    elif returns == "continuously compounded":
+        StockReturns = np.log(Data / Data.shift(1)).dropna()
+
+    results = rolling_var(StockReturns, window, confidence, fit_t=fit_t)
+    return results, backtest_var(results, confidence)
@@ -1,9 +1,47 @@
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from scipy.stats import norm, t
+from instrumentation import stage
+from market_data import get_close_prices
+from t_fit import fit_t
 
-def Param_Var_CVaR(Ticker, Start, End, confidence, returns):
+def param_var_cvar(mu, StockStd, nu, confidence_decimal):
+    """
+    Calculates parametric VaR and CVaR from the return moments, for the normal and t-distributions.
+
+    Parameters
+    ----------
+    mu : float or array_like
+        The mean of the returns.
+    StockStd : float or array_like
+        The standard deviation of the returns.
+    nu : float or array_like
+        The degrees of freedom of the t-distribution.
+    confidence_decimal : float
+        The confidence level expressed as a decimal (e.g., 0.99 for 99%).
+
+    Returns
+    -------
+    VaR_norm, VaR_t, CVaR_norm, CVaR_t : float or numpy.ndarray
+        The 1-day VaR and CVaR, broadcast over the inputs so that many windows can be evaluated at once.
+    """
+    from scipy.stats import norm, t
+
+    # Parametric VaR using normal distribution
+    VaR_norm = norm.ppf(confidence_decimal) * StockStd - mu
+
+    # Parametric VaR using t-distribution
+    VaR_t = t.ppf(confidence_decimal, nu) * StockStd * np.sqrt((nu - 2) / nu) - mu
+
+    # Parametric CVaR using normal distribution
+    CVaR_norm = (norm.pdf(norm.ppf(1 - confidence_decimal)) / (1 - confidence_decimal)) * StockStd - mu
+
+    # Parametric CVaR using t-distribution
+    x = t.ppf(1 - confidence_decimal, nu)
+    CVaR_t = (-1 / (1 - confidence_decimal)) * (1 - nu) ** (-1) * (nu - 2 + x ** 2) * t.pdf(x, nu) * StockStd - mu
+
+    return VaR_norm, VaR_t, CVaR_norm, CVaR_t
+
+def Param_Var_CVaR(Ticker, Start, End, confidence, returns, fetcher=None, cache_dir=None):
     """
     Calculates Parametric Value at Risk (VaR) and Conditional Value at Risk (CVaR) for a given stock.
 
@@ -17,6 +55,12 @@ def Param_Var_CVaR(Ticker, Start, End, confidence, returns):
         The end date for the data in 'YYYY-MM-DD' format.
     confidence : float
         The confidence level for VaR and CVaR calculation, expressed as a percentage (e.g., 99 for 99%).
+    returns : str
+        The type of returns to calculate, "simple" or "continuously compounded".
+    fetcher : callable, optional
+        Price source passed to market_data.get_close_prices, defaults to Yahoo Finance.
+    cache_dir : str, optional
+        Price store passed to market_data.get_close_prices, defaults to market_data.CACHE_DIR.
 
     Returns
     -------
@@ -56,35 +100,27 @@ def Param_Var_CVaR(Ticker, Start, End, confidence, returns):
         Start = pd.to_datetime(Start) - pd.Timedelta(days=1)
         End = pd.to_datetime(End)
 
-    # Fetch data from Yahoo Finance using yfinance
-    Data = yf.download(Ticker, start=Start, end=End, auto_adjust=True)['Close']
+    # Fetch data from the local price cache, only missing dates are downloaded from Yahoo Finance
+    with stage("param_var.prices"):
+        Data = get_close_prices(Ticker, Start, End, fetcher=fetcher, cache_dir=cache_dir)
 
     # Calculate daily returns
-    if returns == "simple":
-        StockReturns = Data.pct_change().dropna()
-    elif returns == "continuously compounded":
-        StockReturns = np.log(Data / Data.shift(1)).dropna()
+    with stage("param_var.returns"):
+        if returns == "simple":
+            StockReturns = Data.pct_change().dropna()
+        elif returns == "continuously compounded":
+            StockReturns = np.log(Data / Data.shift(1)).dropna()
 
     StockStd = StockReturns.std()
     mu = StockReturns.mean()
 
     # Finding the degrees of freedom from the return distribution and rounding
-    tfit = t.fit(StockReturns)
+    with stage("param_var.t_fit"):
+        tfit = fit_t(StockReturns)
     nu, mu_t, std_t = tfit
     nu = np.round(nu)
 
-    # Parametric VaR using normal distribution
-    VaR_norm = norm.ppf(confidence_decimal) * StockStd - mu
-
-    # Parametric VaR using t-distribution
-    VaR_t = t.ppf(confidence_decimal, nu) * StockStd * np.sqrt((nu - 2) / nu) - mu
-
-    # Parametric CVaR using normal distribution
-    CVaR_norm = (norm.pdf(norm.ppf(1 - confidence_decimal)) / (1 - confidence_decimal)) * StockStd - mu
-
-    # Parametric CVaR using t-distribution
-    x = t.ppf(1 - confidence_decimal, nu)
-    CVaR_t = (-1 / (1 - confidence_decimal)) * (1 - nu) ** (-1) * (nu - 2 + x ** 2) * t.pdf(x, nu) * StockStd - mu
+    VaR_norm, VaR_t, CVaR_norm, CVaR_t = param_var_cvar(mu, StockStd, nu, confidence_decimal)
 
     # Calculate stock volatility (standard deviation of returns)
     StockVolatilityDay = StockStd